@@ -0,0 +1,82 @@
+from typing import Iterable, List
+
+from django.db.models import QuerySet
+
+from advertisements.models import Advertisement, AdCard
+
+LOCATIONS_SEPARATOR = "\n"
+
+
+def build_ad_card(advertisement: Advertisement) -> AdCard:
+    """
+    Собирает карточку объявления из объявления с загруженными автором,
+    категорией и местоположениями автора
+    :param advertisement: Объявление
+    :return: Несохранённая карточка объявления
+    """
+    locations: List[str] = [location.name for location in advertisement.author.location.all()]
+    return AdCard(
+        id=advertisement.id,
+        name=advertisement.name,
+        author_id=advertisement.author_id,
+        author=advertisement.author.username,
+        price=advertisement.price,
+        category_id=advertisement.category_id,
+        category=advertisement.category.name,
+        locations=locations,
+        locations_text=LOCATIONS_SEPARATOR.join(locations),
+    )
+
+
+def refresh_ad_cards(advertisements: QuerySet) -> int:
+    """
+    Пересобирает карточки для выбранных объявлений
+    :param advertisements: Выборка объявлений
+    :return: Количество обновлённых карточек
+    """
+    ad_cards: List[AdCard] = [
+        build_ad_card(advertisement) for advertisement in advertisements
+        .select_related("author", "category")
+        .prefetch_related("author__location")
+    ]
+    AdCard.objects.bulk_create(
+        ad_cards,
+        update_conflicts=True,
+        unique_fields=["id"],
+        update_fields=[
+            "name", "author_id", "author", "price",
+            "category_id", "category", "locations", "locations_text",
+        ],
+    )
+    return len(ad_cards)
+
+
+def refresh_ad_cards_for_authors(author_ids: Iterable[int]) -> int:
+    """
+    Пересобирает карточки всех объявлений указанных авторов
+    :param author_ids: Список id авторов
+    :return: Количество обновлённых карточек
+    """
+    return refresh_ad_cards(Advertisement.objects.filter(author_id__in=list(author_ids)))
+
+
+def rebuild_ad_cards(batch_size: int = 1000) -> int:
+    """
+    Полностью пересобирает таблицу карточек объявлений
+    :param batch_size: Количество объявлений, обрабатываемых за один запрос
+    :return: Количество карточек после пересборки
+    """
+    AdCard.objects.exclude(id__in=Advertisement.objects.values("id")).delete()
+
+    total: int = 0
+    last_id: int = 0
+    while True:
+        batch_ids: List[int] = list(
+            Advertisement.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not batch_ids:
+            return total
+        total += refresh_ad_cards(Advertisement.objects.filter(id__in=batch_ids))
+        last_id = batch_ids[-1]
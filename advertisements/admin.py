@@ -1,5 +1,6 @@
 from django.contrib import admin
-from advertisements.models import Category, Advertisement
+from advertisements.models import Category, Advertisement, ArchivedAdvertisement
 
 admin.site.register(Category)
 admin.site.register(Advertisement)
+admin.site.register(ArchivedAdvertisement)
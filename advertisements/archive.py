@@ -0,0 +1,50 @@
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from advertisements.models import Advertisement, ArchivedAdvertisement
+
+ARCHIVED_FIELDS = [
+    "id", "name", "author_id", "price", "description",
+    "is_published", "image", "category_id",
+]
+
+
+def archive_advertisements(advertisements: QuerySet, batch_size: int) -> int:
+    """
+    Переносит объявления в архив пачками. Удаление из основной таблицы
+    идёт через ORM, чтобы сигналы обновили карточки объявлений
+    :param advertisements: Выборка объявлений для архивации
+    :param batch_size: Количество объявлений в одной пачке
+    :return: Количество перенесённых объявлений
+    """
+    archived: int = 0
+    while True:
+        with transaction.atomic():
+            rows: List[Dict] = list(
+                advertisements.order_by("id").values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return archived
+
+            ArchivedAdvertisement.objects.bulk_create(
+                [ArchivedAdvertisement(**row) for row in rows]
+            )
+            Advertisement.objects.filter(id__in=[row["id"] for row in rows]).delete()
+        archived += len(rows)
+
+
+def restore_advertisement(archived_advertisement: ArchivedAdvertisement) -> Advertisement:
+    """
+    Возвращает объявление из архива в основную таблицу с тем же id
+    :param archived_advertisement: Архивное объявление
+    :return: Восстановленное объявление
+    """
+    with transaction.atomic():
+        advertisement = Advertisement(**{
+            field: getattr(archived_advertisement, field) for field in ARCHIVED_FIELDS
+        })
+        advertisement.save(force_insert=True)
+        archived_advertisement.delete()
+    return advertisement
@@ -0,0 +1,13 @@
+from django.conf import settings
+
+from advertisements.models import Category, Advertisement
+from homework_29_2.cache import DimensionCache, PrefixIndex
+
+category_cache = DimensionCache("category", Category)
+
+advertisement_name_index = PrefixIndex(
+    "advertisement_name_index", Advertisement, check_interval=settings.AUTOCOMPLETE_CHECK_INTERVAL
+)
+category_name_index = PrefixIndex(
+    "category_name_index", Category, check_interval=settings.AUTOCOMPLETE_CHECK_INTERVAL
+)
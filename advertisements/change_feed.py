@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Optional
+
+from django.db import connections, transaction
+from django.db.models import Max
+
+from advertisements.models import Advertisement, AdvertisementChange, AdvertisementChangeAction
+
+# Ключ advisory-блокировки PostgreSQL, которая упорядочивает присвоение номеров seq
+CHANGE_FEED_LOCK_KEY = 292001
+
+
+def _lock_change_feed() -> None:
+    connection = connections[AdvertisementChange.objects.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGE_FEED_LOCK_KEY])
+
+
+def publish_changes() -> int:
+    """
+    Присваивает номера seq зафиксированным записям журнала.
+    Блокировка держится только на время присвоения номеров, а записи
+    незафиксированных транзакций этой транзакции не видны и получат
+    номера больше уже выданных
+    :return: Количество опубликованных записей
+    """
+    # Транзакция и блокировка нужны, только если есть неопубликованные записи
+    if not AdvertisementChange.objects.filter(seq__isnull=True).exists():
+        return 0
+
+    with transaction.atomic(using=AdvertisementChange.objects.db):
+        _lock_change_feed()
+        new_changes: List[AdvertisementChange] = list(
+            AdvertisementChange.objects.filter(seq__isnull=True).order_by("id").only("id")
+        )
+        if not new_changes:
+            return 0
+
+        last_seq: int = AdvertisementChange.objects.aggregate(last_seq=Max("seq"))["last_seq"] or 0
+        for seq, change in enumerate(new_changes, start=last_seq + 1):
+            change.seq = seq
+        AdvertisementChange.objects.bulk_update(new_changes, ["seq"], batch_size=1000)
+        return len(new_changes)
+
+
+def serialize_advertisement(advertisement: Advertisement) -> Dict:
+    """
+    Преобразует объявление в данные для журнала изменений
+    :param advertisement: Объявление
+    :return: Словарь с полями объявления
+    """
+    return {
+        "id": advertisement.id,
+        "name": advertisement.name,
+        "author_id": advertisement.author_id,
+        "price": advertisement.price,
+        "description": advertisement.description,
+        "is_published": advertisement.is_published,
+        "image": advertisement.image.name or None,
+        "category_id": advertisement.category_id,
+    }
+
+
+def record_change(action: str, advertisement: Advertisement) -> AdvertisementChange:
+    """
+    Добавляет запись в журнал изменений
+    :param action: Действие из AdvertisementChangeAction
+    :param advertisement: Изменённое объявление
+    :return: Запись журнала
+    """
+    data: Optional[Dict] = None
+    if action != AdvertisementChangeAction.DELETE:
+        data = serialize_advertisement(advertisement)
+    change: AdvertisementChange = AdvertisementChange.objects.create(
+        advertisement_id=advertisement.id, action=action, data=data
+    )
+    transaction.on_commit(publish_changes)
+    return change
+
+
+def record_deletions(advertisement_ids: Iterable[int]) -> None:
+    """
+    Добавляет в журнал записи об удалении нескольких объявлений
+    :param advertisement_ids: Список id удалённых объявлений
+    """
+    AdvertisementChange.objects.bulk_create([
+        AdvertisementChange(advertisement_id=ad_id, action=AdvertisementChangeAction.DELETE)
+        for ad_id in advertisement_ids
+    ])
+    transaction.on_commit(publish_changes)
+
+
+def get_changes(since: int, limit: int) -> List[Dict]:
+    """
+    Возвращает изменения с номером больше since
+    :param since: Последний полученный номер изменения
+    :param limit: Максимальное количество изменений
+    :return: Список изменений
+    """
+    # Обычно записи публикует писатель после фиксации, здесь публикуются
+    # только оставшиеся, например, если процесс писателя завершился
+    publish_changes()
+    return list(
+        AdvertisementChange.objects.filter(seq__gt=since)
+        .order_by("seq")
+        .values("seq", "advertisement_id", "action", "data", "created_at")[:limit]
+    )
@@ -0,0 +1,71 @@
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Model
+
+from advertisements.cache import advertisement_name_index
+from advertisements.change_feed import record_deletions
+from advertisements.models import Advertisement, AdCard, ArchivedAdvertisement
+from advertisements.price_stats import remove_prices
+from jobs.queue import enqueue
+
+
+def _delete_batch(model: Type[Model], author_id: int, batch_size: int) -> int:
+    with transaction.atomic():
+        batch: List[Tuple[int, str, int, int, str]] = list(
+            model.objects.filter(author_id=author_id)
+            .order_by("id")
+            .values_list("id", "image", "category_id", "price", "name")[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        ad_ids: List[int] = [ad_id for ad_id, _, _, _, _ in batch]
+        image_names: List[str] = [image for _, image, _, _, _ in batch if image]
+
+        if model is Advertisement:
+            record_deletions(ad_ids)
+            if settings.AD_CARDS_ENABLED:
+                AdCard.objects.filter(id__in=ad_ids).delete()
+        # _raw_delete выполняет один DELETE ... WHERE id IN (...) без Collector
+        model.objects.filter(id__in=ad_ids)._raw_delete(model.objects.db)
+
+        if model is Advertisement:
+            prices_by_category: Dict[int, List[int]] = defaultdict(list)
+            for _, _, category_id, price, _ in batch:
+                prices_by_category[category_id].append(price)
+            for category_id, prices in prices_by_category.items():
+                remove_prices(category_id, prices)
+
+            names: Counter = Counter(name for _, _, _, _, name in batch)
+            advertisement_name_index.record_deltas((name, -count) for name, count in names.items())
+
+        if image_names:
+            enqueue("advertisements.delete_image_files", *image_names)
+    return len(batch)
+
+
+def delete_author_advertisements(author_id: int, batch_size: int,
+                                 on_batch: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Удаляет все объявления автора, включая архивные, пачками,
+    без загрузки моделей в память и без отправки сигналов на каждое объявление.
+    Каждая пачка удаляется в отдельной транзакции, чтобы не держать блокировки долго.
+    Файлы изображений удаляются фоновой задачей
+    :param author_id: id автора
+    :param batch_size: Количество объявлений в одной пачке
+    :param on_batch: Функция, которая получает число удалённых объявлений после каждой пачки
+    :return: Количество удалённых объявлений
+    """
+    deleted: int = 0
+    for model in (Advertisement, ArchivedAdvertisement):
+        while True:
+            batch_deleted: int = _delete_batch(model, author_id, batch_size)
+            if not batch_deleted:
+                break
+            deleted += batch_deleted
+            if on_batch is not None:
+                on_batch(deleted)
+    return deleted
@@ -0,0 +1,24 @@
+from django.db.models import Max
+
+from advertisements.models import AdvertisementChange
+from homework_29_2.versions import get_versions
+
+
+def get_catalog_etag(request, *args, **kwargs) -> str:
+    """
+    Вычисляет ETag для списков и карточек объявлений, пользователей, категорий
+    и местоположений без сериализации ответа: по последнему номеру в журнале
+    изменений объявлений и версиям категорий, местоположений и пользователей.
+    Все маркеры хранятся в БД, поэтому они общие для всех процессов и только растут:
+    старый ETag не может снова стать актуальным
+    :param request: Запрос
+    :return: ETag без кавычек
+    """
+    last_seq: int = AdvertisementChange.objects.aggregate(last_seq=Max("seq"))["last_seq"] or 0
+    versions = get_versions(["category", "location", "user"])
+    return ".".join(str(marker) for marker in (
+        last_seq,
+        versions["category"],
+        versions["location"],
+        versions["user"],
+    ))
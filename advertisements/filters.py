@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import QueryDict
+
+from advertisements.models import Advertisement, AdCard
+
+LIST_FILTER_PARAMS = ["cat", "text", "location", "price_from", "price_to"]
+
+
+def get_list_queryset() -> QuerySet:
+    """
+    Возвращает выборку для списка объявлений:
+    из таблицы AdCard при AD_CARDS_ENABLED, иначе из Advertisement
+    :return: Выборка, отсортированная по убыванию цены
+    """
+    if settings.AD_CARDS_ENABLED:
+        return AdCard.objects.all().order_by("-price")
+    return Advertisement.objects.all().order_by("-price")
+
+
+def filter_advertisements(queryset: QuerySet, params: QueryDict) -> QuerySet:
+    """
+    Фильтрует объявления по параметрам запроса:
+     - cat - по категориям
+     - text - по тексту в названии объявления
+     - location - по местоположению автора
+     - price_from, price_to - по цене
+    :param queryset: Выборка Advertisement или AdCard
+    :param params: Параметры запроса
+    :return: Отфильтрованная выборка
+    """
+    location_lookup = "author__location__name__icontains"
+    if queryset.model is AdCard:
+        location_lookup = "locations_text__icontains"
+
+    categories = params.getlist("cat")
+    if categories:
+        queryset = queryset.filter(category_id__in=categories)
+
+    text = params.get("text")
+    if text:
+        queryset = queryset.filter(name__icontains=text)
+
+    location = params.get("location")
+    if location:
+        queryset = queryset.filter(**{location_lookup: location})
+
+    price_from = params.get("price_from")
+    if price_from:
+        queryset = queryset.filter(price__gte=price_from)
+
+    price_to = params.get("price_to")
+    if price_to:
+        queryset = queryset.filter(price__lte=price_to)
+
+    return queryset
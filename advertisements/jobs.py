@@ -0,0 +1,49 @@
+from datetime import timedelta
+from typing import Set
+
+from django.conf import settings
+
+from advertisements.models import Advertisement
+from advertisements.price_stats import rebuild_all_category_stats
+from homework_29_2.cache import prune_prefix_index_deltas
+from jobs.queue import job
+
+
+@job("advertisements.delete_image_files")
+def delete_image_files(*names: str) -> None:
+    """
+    Удаляет файлы изображений, которые больше не используются ни одним объявлением
+    :param names: Имена файлов в хранилище
+    """
+    used_names: Set[str] = set(
+        Advertisement.objects.filter(image__in=names).values_list("image", flat=True)
+    )
+    storage = Advertisement._meta.get_field("image").storage
+    for name in names:
+        if name not in used_names:
+            storage.delete(name)
+
+
+@job("advertisements.delete_image_file")
+def delete_image_file(name: str) -> None:
+    """
+    Удаляет файл изображения, если он больше не используется ни одним объявлением
+    :param name: Имя файла в хранилище
+    """
+    delete_image_files(name)
+
+
+@job("advertisements.refresh_price_stats", interval=settings.PRICE_STATS_REFRESH_INTERVAL)
+def refresh_price_stats() -> None:
+    """
+    Пересчитывает статистику цен всех категорий с нуля
+    """
+    rebuild_all_category_stats()
+
+
+@job("advertisements.prune_prefix_index_deltas", interval=settings.AUTOCOMPLETE_DELTA_RETENTION)
+def prune_deltas() -> None:
+    """
+    Удаляет из журнала индексов автодополнения записи старше AUTOCOMPLETE_DELTA_RETENTION секунд
+    """
+    prune_prefix_index_deltas(timedelta(seconds=settings.AUTOCOMPLETE_DELTA_RETENTION))
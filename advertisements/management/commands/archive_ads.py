@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from advertisements.archive import archive_advertisements
+from advertisements.models import Advertisement
+
+
+class Command(BaseCommand):
+    help = "Переносит неопубликованные объявления в архив (запускается по расписанию)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--ids", type=int, nargs="+",
+            help="Перенести в архив только объявления с указанными id"
+        )
+
+    def handle(self, *args, **options):
+        advertisements = Advertisement.objects.filter(is_published=False)
+        if options["ids"]:
+            advertisements = Advertisement.objects.filter(id__in=options["ids"])
+
+        total: int = archive_advertisements(advertisements, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Перенесено в архив: {total}"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from homework_29_2.middleware import brotli, compress
+
+
+class Command(BaseCommand):
+    help = "Измеряет экономию байт от сжатия на первых страницах /ad/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=5)
+        parser.add_argument("--url", default="/ad/")
+
+    def handle(self, *args, **options):
+        encodings = ["gzip"] + (["br"] if brotli is not None else [])
+        self.stdout.write("page\traw\t" + "\t".join(encodings))
+
+        totals = {"raw": 0, **{encoding: 0 for encoding in encodings}}
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            client = Client()
+            for page in range(1, options["pages"] + 1):
+                response = client.get(options["url"], {"page": page})
+                if response.status_code != 200:
+                    break
+
+                sizes = {"raw": len(response.content)}
+                for encoding in encodings:
+                    sizes[encoding] = len(compress(response.content, encoding))
+                for key, size in sizes.items():
+                    totals[key] += size
+                self.stdout.write(f"{page}\t" + "\t".join(str(sizes[key]) for key in ["raw", *encodings]))
+
+        for encoding in encodings:
+            saved: int = totals["raw"] - totals[encoding]
+            percent: float = 100 * saved / totals["raw"] if totals["raw"] else 0.0
+            self.stdout.write(f"{encoding}: сэкономлено {saved} байт из {totals['raw']} ({percent:.1f}%)")
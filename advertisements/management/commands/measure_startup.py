@@ -0,0 +1,98 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе, чтобы время импорта не искажали уже загруженные модули
+WORKER_CODE = """
+import asyncio, io, json, sys, time
+
+server, path, host = sys.argv[1:4]
+started = time.perf_counter()
+application = __import__(f"homework_29_2.{server}", fromlist=["application"]).application
+imported = time.perf_counter()
+
+
+def request_wsgi():
+    statuses = []
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+        "SERVER_NAME": host, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1", "HTTP_HOST": host,
+        "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr, "wsgi.url_scheme": "http",
+        "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+    }
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b"".join(response)
+    response.close()
+    return int(statuses[0].split()[0])
+
+
+async def request_asgi():
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", host.encode())], "client": ("127.0.0.1", 0), "server": (host, 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    return messages[0]["status"]
+
+
+def request():
+    return request_wsgi() if server == "wsgi" else asyncio.run(request_asgi())
+
+
+status = request()
+first = time.perf_counter()
+request()
+second = time.perf_counter()
+print(json.dumps({
+    "status": status,
+    "import_ms": (imported - started) * 1000,
+    "first_ms": (first - imported) * 1000,
+    "second_ms": (second - first) * 1000,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Измеряет холодный старт воркера: время импорта wsgi.py/asgi.py и время до первого ответа"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--server", choices=["wsgi", "asgi"], action="append")
+        parser.add_argument("--path", default="/ad/")
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--profile", help="Значение DJANGO_PROFILE для запускаемых воркеров")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        if options["profile"]:
+            env["DJANGO_PROFILE"] = options["profile"]
+
+        self.stdout.write("server\tstatus\timport, ms\tfirst response, ms\tsecond response, ms")
+        for server in options["server"] or ["wsgi", "asgi"]:
+            results = []
+            for _ in range(options["runs"]):
+                completed = subprocess.run(
+                    [sys.executable, "-c", WORKER_CODE, server, options["path"], options["host"]],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+                )
+                if completed.returncode != 0:
+                    raise CommandError(completed.stderr)
+                results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+            medians = [statistics.median(result[key] for result in results)
+                       for key in ["import_ms", "first_ms", "second_ms"]]
+            self.stdout.write(f"{server}\t{results[-1]['status']}\t" + "\t".join(f"{value:.1f}" for value in medians))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from advertisements.models import AdvertisementChange
+
+
+class Command(BaseCommand):
+    help = "Удаляет из журнала изменения объявлений старше AD_CHANGES_RETENTION_DAYS дней"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.AD_CHANGES_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        last_change = AdvertisementChange.objects.filter(seq__isnull=False).order_by("-seq").first()
+        if last_change is None:
+            return
+
+        # Последняя запись остаётся всегда: её seq входит в ETag списков.
+        # Ещё не опубликованные записи без seq тоже не удаляются
+        deleted, _ = AdvertisementChange.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=options["days"]),
+            seq__lt=last_change.seq
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Удалено изменений: {deleted}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from advertisements.ad_cards import rebuild_ad_cards
+
+
+class Command(BaseCommand):
+    help = "Полностью пересобирает таблицу карточек объявлений (AdCard)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total: int = rebuild_ad_cards(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано карточек: {total}"))
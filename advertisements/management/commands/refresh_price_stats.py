@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from advertisements.price_stats import rebuild_all_category_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает статистику цен всех категорий с нуля"
+
+    def handle(self, *args, **options):
+        rebuilt: int = rebuild_all_category_stats()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано категорий: {rebuilt}"))
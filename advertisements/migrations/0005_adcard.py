@@ -0,0 +1,31 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0004_advertisement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdCard',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('author_id', models.BigIntegerField(db_index=True)),
+                ('author', models.CharField(max_length=200)),
+                ('price', models.PositiveIntegerField(db_index=True)),
+                ('category_id', models.BigIntegerField(db_index=True)),
+                ('category', models.CharField(max_length=200)),
+                ('locations', models.JSONField(default=list)),
+                ('locations_text', models.TextField(default='')),
+            ],
+            options={
+                'verbose_name': 'Карточка объявления',
+                'verbose_name_plural': 'Карточки объявлений',
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('advertisements', '0005_adcard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAdvertisement',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('price', models.PositiveIntegerField()),
+                ('description', models.CharField(max_length=2000)),
+                ('is_published', models.BooleanField()),
+                ('image', models.ImageField(null=True, upload_to='images')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.user')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='advertisements.category')),
+            ],
+            options={
+                'verbose_name': 'Архивное объявление',
+                'verbose_name_plural': 'Архивные объявления',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0006_archivedadvertisement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdvertisementChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('advertisement_id', models.BigIntegerField(db_index=True)),
+                ('action', models.CharField(choices=[('create', 'create'), ('update', 'update'), ('delete', 'delete')], max_length=6)),
+                ('data', models.JSONField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение объявления',
+                'verbose_name_plural': 'Изменения объявлений',
+            },
+        ),
+    ]
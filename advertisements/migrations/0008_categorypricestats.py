@@ -0,0 +1,50 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:23
+
+from bisect import bisect_right
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Min, Max
+import django.db.models.deletion
+
+
+def fill_category_price_stats(apps, schema_editor):
+    Advertisement = apps.get_model('advertisements', 'Advertisement')
+    CategoryPriceStats = apps.get_model('advertisements', 'CategoryPriceStats')
+    bounds = settings.PRICE_HISTOGRAM_BOUNDS
+
+    for totals in (
+        Advertisement.objects.values('category_id')
+        .annotate(count=Count('id'), total=Sum('price'), min_price=Min('price'), max_price=Max('price'))
+        .order_by()
+    ):
+        histogram = [0] * len(bounds)
+        for price in Advertisement.objects.filter(category_id=totals['category_id']).values_list('price', flat=True):
+            histogram[max(bisect_right(bounds, price) - 1, 0)] += 1
+        CategoryPriceStats.objects.create(histogram=histogram, **totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0007_advertisementchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryPriceStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='advertisements.category')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.BigIntegerField(default=0)),
+                ('min_price', models.PositiveIntegerField(null=True)),
+                ('max_price', models.PositiveIntegerField(null=True)),
+                ('histogram', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name': 'Статистика цен категории',
+                'verbose_name_plural': 'Статистика цен категорий',
+            },
+        ),
+        migrations.RunPython(fill_category_price_stats, migrations.RunPython.noop),
+    ]
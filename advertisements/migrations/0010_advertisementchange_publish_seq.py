@@ -0,0 +1,35 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:40
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_seq(apps, schema_editor):
+    AdvertisementChange = apps.get_model("advertisements", "AdvertisementChange")
+    AdvertisementChange.objects.update(seq=F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0009_dataversion'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='advertisementchange',
+            old_name='seq',
+            new_name='id',
+        ),
+        migrations.AlterField(
+            model_name='advertisementchange',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AddField(
+            model_name='advertisementchange',
+            name='seq',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(copy_seq, migrations.RunPython.noop),
+    ]
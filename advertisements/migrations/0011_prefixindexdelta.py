@@ -0,0 +1,28 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisements', '0010_advertisementchange_publish_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrefixIndexDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.BigIntegerField(null=True, unique=True)),
+                ('index', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=200)),
+                ('delta', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Изменение индекса автодополнения',
+                'verbose_name_plural': 'Изменения индексов автодополнения',
+            },
+        ),
+    ]
@@ -1,5 +1,11 @@
+from typing import Any, Dict, Optional
+
+from django.db import transaction
 from django.db.models import Model, CharField, \
-    PositiveIntegerField, BooleanField, ForeignKey, CASCADE, ImageField
+    PositiveIntegerField, BooleanField, ForeignKey, CASCADE, ImageField, \
+    BigIntegerField, JSONField, TextField, DateTimeField, TextChoices, \
+    OneToOneField, IntegerField
+from django.utils.translation import gettext_lazy as _
 
 from users.models import User
 
@@ -25,6 +31,28 @@ class Advertisement(Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def get_saved_values(cls, pk: Optional[int]) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает название, цену и категорию объявления, сохранённые в БД.
+        Внутри транзакции строка блокируется до её завершения
+        :param pk: id объявления
+        :return: Словарь значений или None, если объявления нет в БД
+        """
+        if pk is None:
+            return None
+        queryset = cls.objects.filter(pk=pk)
+        if transaction.get_connection(queryset.db).in_atomic_block:
+            queryset = queryset.select_for_update()
+        return queryset.values("name", "price", "category_id").first()
+
+    def save(self, *args, **kwargs):
+        # Сигналам нужны значения до изменения. Они читаются из БД под блокировкой
+        # строки в транзакции сохранения, а не берутся из экземпляра, который мог устареть
+        with transaction.atomic(using=kwargs.get("using")):
+            self._old_values = self.get_saved_values(self.pk)
+            super().save(*args, **kwargs)
+
     name = CharField(max_length=200)
     author = ForeignKey(User, on_delete=CASCADE)
     price = PositiveIntegerField()
@@ -32,3 +60,138 @@ class Advertisement(Model):
     is_published = BooleanField()
     image = ImageField(null=True, upload_to="images")
     category = ForeignKey(Category, on_delete=CASCADE)
+
+
+class ArchivedAdvertisement(Model):
+    """
+    Архив объявлений, вынесенных из основной таблицы.
+    id совпадает с id исходного объявления
+    """
+
+    class Meta:
+        verbose_name = "Архивное объявление"
+        verbose_name_plural = "Архивные объявления"
+
+    def __str__(self):
+        return self.name
+
+    id = BigIntegerField(primary_key=True)
+    name = CharField(max_length=200)
+    author = ForeignKey(User, on_delete=CASCADE)
+    price = PositiveIntegerField()
+    description = CharField(max_length=2000)
+    is_published = BooleanField()
+    image = ImageField(null=True, upload_to="images")
+    category = ForeignKey(Category, on_delete=CASCADE)
+    archived_at = DateTimeField(auto_now_add=True)
+
+
+class AdCard(Model):
+    """
+    Денормализованная карточка объявления для списка /ad/.
+    Содержит ровно те данные, которые выводит AdvertisementListViewSerializer
+    """
+
+    class Meta:
+        verbose_name = "Карточка объявления"
+        verbose_name_plural = "Карточки объявлений"
+
+    def __str__(self):
+        return self.name
+
+    id = BigIntegerField(primary_key=True)
+    name = CharField(max_length=200)
+    author_id = BigIntegerField(db_index=True)
+    author = CharField(max_length=200)
+    price = PositiveIntegerField(db_index=True)
+    category_id = BigIntegerField(db_index=True)
+    category = CharField(max_length=200)
+    locations = JSONField(default=list)
+    locations_text = TextField(default="")
+
+
+class AdvertisementChangeAction(TextChoices):
+    CREATE = "create", _("create")
+    UPDATE = "update", _("update")
+    DELETE = "delete", _("delete")
+
+
+class AdvertisementChange(Model):
+    """
+    Журнал изменений объявлений, только для добавления.
+    Запись появляется вместе с изменением объявления без номера seq,
+    номер присваивается после фиксации транзакции, поэтому seq возрастает
+    в порядке фиксации и читатель не пропустит запись с меньшим seq
+    """
+
+    class Meta:
+        verbose_name = "Изменение объявления"
+        verbose_name_plural = "Изменения объявлений"
+
+    def __str__(self):
+        return f"{self.seq}: {self.action} {self.advertisement_id}"
+
+    seq = BigIntegerField(null=True, unique=True)
+    advertisement_id = BigIntegerField(db_index=True)
+    action = CharField(max_length=6, choices=AdvertisementChangeAction.choices)
+    data = JSONField(null=True)
+    created_at = DateTimeField(auto_now_add=True, db_index=True)
+
+
+class CategoryPriceStats(Model):
+    """
+    Агрегаты цен объявлений категории, обновляемые при каждом изменении объявления.
+    histogram - количество объявлений в интервалах PRICE_HISTOGRAM_BOUNDS
+    """
+
+    class Meta:
+        verbose_name = "Статистика цен категории"
+        verbose_name_plural = "Статистика цен категорий"
+
+    def __str__(self):
+        return f"{self.category_id}: {self.count}"
+
+    category = OneToOneField(Category, on_delete=CASCADE, primary_key=True)
+    count = PositiveIntegerField(default=0)
+    total = BigIntegerField(default=0)
+    min_price = PositiveIntegerField(null=True)
+    max_price = PositiveIntegerField(null=True)
+    histogram = JSONField(default=list)
+
+
+class DataVersion(Model):
+    """
+    Версии наборов данных, которые процессы держат в памяти.
+    Изменение версии сообщает всем процессам, что их копии устарели
+    """
+
+    class Meta:
+        verbose_name = "Версия данных"
+        verbose_name_plural = "Версии данных"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    name = CharField(max_length=100, primary_key=True)
+    value = BigIntegerField(default=0)
+
+
+class PrefixIndexDelta(Model):
+    """
+    Журнал изменений весов значений в индексах автодополнения, только для добавления.
+    Как и в AdvertisementChange, номер seq присваивается после фиксации транзакции,
+    поэтому процессы применяют изменения к своим индексам в порядке фиксации
+    """
+
+    class Meta:
+        verbose_name = "Изменение индекса автодополнения"
+        verbose_name_plural = "Изменения индексов автодополнения"
+
+    def __str__(self):
+        return f"{self.seq}: {self.index} {self.value} {self.delta:+d}"
+
+    seq = BigIntegerField(null=True, unique=True)
+    index = CharField(max_length=100)
+    value = CharField(max_length=200)
+    delta = IntegerField()
+    created_at = DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,136 @@
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator, Page, PageNotAnInteger, EmptyPage
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+
+class ApproximateCountPage(Page):
+    """
+    Страница выборки с оценочным количеством записей: наличие следующей страницы
+    определяется по лишней записи, выбранной сверх размера страницы, а не по num_pages
+    """
+
+    has_more: Optional[bool] = None
+
+    def has_next(self) -> bool:
+        if self.has_more is None:
+            return super().has_next()
+        return self.has_more
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Пагинатор, который считает записи точно только до порога,
+    а для больших выборок берёт оценку планировщика PostgreSQL
+    или закешированный на время TTL точный подсчёт
+    """
+
+    count_is_exact: bool = True
+
+    @cached_property
+    def count(self) -> int:
+        threshold: int = settings.PAGINATION_EXACT_COUNT_THRESHOLD
+
+        # COUNT по подзапросу с LIMIT останавливается на пороге
+        bounded_count: int = self.object_list[:threshold + 1].count()
+        if bounded_count <= threshold:
+            self.count_is_exact = True
+            return bounded_count
+
+        self.count_is_exact = False
+        estimated_count: Optional[int] = self._get_planner_estimate()
+        if estimated_count is None:
+            estimated_count = self._get_cached_count()
+        return max(estimated_count, threshold + 1)
+
+    def _get_planner_estimate(self) -> Optional[int]:
+        """
+        Возвращает оценку числа строк из плана запроса (только для PostgreSQL)
+        :return: Оценка числа строк или None, если оценку получить нельзя
+        """
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _get_cached_count(self) -> int:
+        """
+        Возвращает точное число строк, закешированное на PAGINATION_COUNT_CACHE_TTL секунд
+        :return: Число строк
+        """
+        queryset = self.object_list.order_by()
+        sql, params = queryset.query.sql_with_params()
+        cache_key: str = "pagination:count:" + hashlib.md5(
+            f"{sql}{params}".encode("utf-8")
+        ).hexdigest()
+
+        cached_count: Optional[int] = cache.get(cache_key)
+        if cached_count is None:
+            cached_count = queryset.count()
+            cache.set(cache_key, cached_count, settings.PAGINATION_COUNT_CACHE_TTL)
+        return cached_count
+
+    def validate_number(self, number) -> int:
+        # count вычисляется лениво и определяет значение count_is_exact
+        self.count
+        if self.count_is_exact:
+            return super().validate_number(number)
+
+        # При оценочном количестве последняя страница известна лишь приблизительно,
+        # поэтому проверяем только корректность номера
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count_is_exact:
+            return super().page(number)
+
+        # Оценка планировщика может ошибаться в обе стороны,
+        # поэтому о следующей странице судим по лишней записи
+        bottom: int = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if number > 1 and not object_list:
+            raise EmptyPage("That page contains no results")
+
+        page: ApproximateCountPage = self._get_page(object_list[:self.per_page], number, self)
+        page.has_more = len(object_list) > self.per_page
+        return page
+
+    def _get_page(self, *args, **kwargs) -> ApproximateCountPage:
+        return ApproximateCountPage(*args, **kwargs)
+
+
+class ApproximateCountPagination(PageNumberPagination):
+    """
+    Постраничная разбивка с приблизительным количеством записей для больших выборок.
+    В ответе поле count_is_exact показывает, является ли count точным
+    """
+    django_paginator_class = ApproximateCountPaginator
+
+    def get_paginated_response(self, data) -> Response:
+        response: Response = super().get_paginated_response(data)
+        response.data["count_is_exact"] = self.page.paginator.count_is_exact
+        return response
+
+    def get_paginated_response_schema(self, schema) -> dict:
+        response_schema: dict = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count_is_exact"] = {"type": "boolean"}
+        return response_schema
@@ -0,0 +1,221 @@
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet, Count, Sum, Min, Max, Q
+
+from advertisements.models import Category, Advertisement, CategoryPriceStats
+
+
+def get_bucket(price: int) -> int:
+    """
+    Возвращает номер интервала гистограммы для цены
+    :param price: Цена
+    :return: Номер интервала в PRICE_HISTOGRAM_BOUNDS
+    """
+    return max(bisect_right(settings.PRICE_HISTOGRAM_BOUNDS, price) - 1, 0)
+
+
+def _recompute_min_max(stats: CategoryPriceStats) -> None:
+    limits: Dict[str, Optional[int]] = Advertisement.objects.filter(
+        category_id=stats.category_id
+    ).aggregate(min_price=Min("price"), max_price=Max("price"))
+    stats.min_price = limits["min_price"]
+    stats.max_price = limits["max_price"]
+
+
+def rebuild_category_stats(category_id: int) -> CategoryPriceStats:
+    """
+    Пересчитывает статистику категории с нуля
+    :param category_id: id категории
+    :return: Статистика категории
+    """
+    with transaction.atomic():
+        # Строка статистики блокируется до подсчёта: изменения, зафиксированные раньше,
+        # попадут в подсчёт, а остальные применятся поверх пересчитанной статистики
+        CategoryPriceStats.objects.get_or_create(category_id=category_id)
+        stats: CategoryPriceStats = CategoryPriceStats.objects.select_for_update().get(category_id=category_id)
+
+        bounds: List[int] = settings.PRICE_HISTOGRAM_BOUNDS
+        histogram: List[int] = [0] * len(bounds)
+        for price, count in (
+            Advertisement.objects.filter(category_id=category_id)
+            .values("price").annotate(count=Count("id")).values_list("price", "count").order_by()
+        ):
+            histogram[get_bucket(price)] += count
+
+        totals: Dict[str, Any] = Advertisement.objects.filter(category_id=category_id).aggregate(
+            count=Count("id"), total=Sum("price"), min_price=Min("price"), max_price=Max("price")
+        )
+        stats.count = totals["count"]
+        stats.total = totals["total"] or 0
+        stats.min_price = totals["min_price"]
+        stats.max_price = totals["max_price"]
+        stats.histogram = histogram
+        stats.save()
+    return stats
+
+
+def rebuild_all_category_stats() -> int:
+    """
+    Пересчитывает статистику всех категорий с нуля
+    :return: Количество пересчитанных категорий
+    """
+    category_ids: List[int] = list(Category.objects.values_list("id", flat=True))
+    for category_id in category_ids:
+        rebuild_category_stats(category_id)
+    return len(category_ids)
+
+
+def add_prices(category_id: int, prices: Iterable[int]) -> None:
+    """
+    Учитывает в статистике категории новые объявления
+    :param category_id: id категории
+    :param prices: Цены добавленных объявлений
+    """
+    prices = list(prices)
+    with transaction.atomic():
+        stats, _ = CategoryPriceStats.objects.select_for_update().get_or_create(category_id=category_id)
+        if len(stats.histogram) != len(settings.PRICE_HISTOGRAM_BOUNDS):
+            rebuild_category_stats(category_id)
+            return
+
+        for price in prices:
+            stats.count += 1
+            stats.total += price
+            stats.histogram[get_bucket(price)] += 1
+            stats.min_price = price if stats.min_price is None else min(stats.min_price, price)
+            stats.max_price = price if stats.max_price is None else max(stats.max_price, price)
+        stats.save()
+
+
+def remove_prices(category_id: int, prices: Iterable[int]) -> bool:
+    """
+    Исключает из статистики категории удалённые объявления.
+    Вызывается после удаления, поэтому min и max пересчитываются по оставшимся
+    :param category_id: id категории
+    :param prices: Цены удалённых объявлений
+    :return: True, если статистика была пересчитана с нуля по текущим объявлениям
+    """
+    prices = list(prices)
+    with transaction.atomic():
+        stats: Optional[CategoryPriceStats] = (
+            CategoryPriceStats.objects.select_for_update().filter(category_id=category_id).first()
+        )
+        # Статистики нет, если категория удаляется вместе с объявлениями
+        if stats is None:
+            return False
+        if len(stats.histogram) != len(settings.PRICE_HISTOGRAM_BOUNDS):
+            rebuild_category_stats(category_id)
+            return True
+
+        for price in prices:
+            stats.count -= 1
+            stats.total -= price
+            stats.histogram[get_bucket(price)] -= 1
+        if stats.min_price in prices or stats.max_price in prices:
+            _recompute_min_max(stats)
+        stats.save()
+    return False
+
+
+def _estimate_median(histogram: List[int], count: int,
+                     min_price: Optional[int], max_price: Optional[int]) -> Optional[float]:
+    # Медиана оценивается линейной интерполяцией внутри интервала гистограммы
+    if not count:
+        return None
+
+    bounds: List[int] = settings.PRICE_HISTOGRAM_BOUNDS
+    target: float = count / 2
+    cumulative: int = 0
+    for index, bucket_count in enumerate(histogram):
+        if bucket_count and cumulative + bucket_count >= target:
+            lower: int = max(bounds[index], min_price)
+            upper: int = bounds[index + 1] if index + 1 < len(bounds) else max_price
+            upper = min(upper, max_price)
+            return round(lower + (upper - lower) * (target - cumulative) / bucket_count, 2)
+        cumulative += bucket_count
+    return float(max_price)
+
+
+def _format_stats(count: int, total: int, min_price: Optional[int], max_price: Optional[int],
+                  histogram: List[int], source: str) -> Dict[str, Any]:
+    bounds: List[int] = settings.PRICE_HISTOGRAM_BOUNDS
+    return {
+        "count": count,
+        "min": min_price,
+        "max": max_price,
+        "avg": round(total / count, 2) if count else None,
+        "median": _estimate_median(histogram, count, min_price, max_price),
+        "histogram": [
+            {
+                "from": bounds[index],
+                "to": bounds[index + 1] if index + 1 < len(bounds) else None,
+                "count": bucket_count,
+            }
+            for index, bucket_count in enumerate(histogram)
+        ],
+        "source": source,
+    }
+
+
+def get_stats_from_aggregates(category_ids: List[str]) -> Dict[str, Any]:
+    """
+    Собирает статистику из агрегатов по категориям без обращения к объявлениям
+    :param category_ids: id категорий, пустой список - все категории
+    :return: Статистика цен
+    """
+    stats_queryset: QuerySet = CategoryPriceStats.objects.all()
+    if category_ids:
+        stats_queryset = stats_queryset.filter(category_id__in=category_ids)
+
+    bounds: List[int] = settings.PRICE_HISTOGRAM_BOUNDS
+    count: int = 0
+    total: int = 0
+    min_prices: List[int] = []
+    max_prices: List[int] = []
+    histogram: List[int] = [0] * len(bounds)
+    for stats in stats_queryset:
+        if len(stats.histogram) != len(bounds):
+            stats = rebuild_category_stats(stats.category_id)
+        count += stats.count
+        total += stats.total
+        if stats.count:
+            min_prices.append(stats.min_price)
+            max_prices.append(stats.max_price)
+        histogram = [left + right for left, right in zip(histogram, stats.histogram)]
+
+    return _format_stats(
+        count, total, min(min_prices, default=None), max(max_prices, default=None),
+        histogram, "aggregates"
+    )
+
+
+def get_stats_from_queryset(queryset: QuerySet) -> Dict[str, Any]:
+    """
+    Считает статистику по выборке объявлений одним агрегирующим запросом
+    :param queryset: Отфильтрованная выборка Advertisement или AdCard
+    :return: Статистика цен
+    """
+    # JOIN по местоположениям может дублировать объявления, поэтому считаем по id
+    queryset = queryset.model.objects.filter(pk__in=queryset.values("pk"))
+
+    bounds: List[int] = settings.PRICE_HISTOGRAM_BOUNDS
+    aggregates: Dict[str, Any] = {
+        "count": Count("id"),
+        "total": Sum("price"),
+        "min_price": Min("price"),
+        "max_price": Max("price"),
+    }
+    for index, lower in enumerate(bounds):
+        bucket_filter = Q(price__gte=lower)
+        if index + 1 < len(bounds):
+            bucket_filter &= Q(price__lt=bounds[index + 1])
+        aggregates[f"bucket_{index}"] = Count("id", filter=bucket_filter)
+
+    result: Dict[str, Any] = queryset.aggregate(**aggregates)
+    return _format_stats(
+        result["count"], result["total"] or 0, result["min_price"], result["max_price"],
+        [result[f"bucket_{index}"] for index in range(len(bounds))], "query"
+    )
@@ -1,8 +1,11 @@
 from rest_framework.fields import SerializerMethodField
-from rest_framework.relations import SlugRelatedField, PrimaryKeyRelatedField, StringRelatedField
+from rest_framework.relations import SlugRelatedField, PrimaryKeyRelatedField
 from rest_framework.serializers import ModelSerializer
 
-from advertisements.models import Category, Advertisement
+from advertisements.cache import category_cache
+from advertisements.models import Category, Advertisement, AdCard, ArchivedAdvertisement
+from homework_29_2.fields import CachedNameRelatedField
+from users.cache import location_cache
 from users.models import User
 
 
@@ -18,7 +21,7 @@ class AdvertisementListViewSerializer(ModelSerializer):
         read_only=True,
         slug_field="username"
     )
-    category = StringRelatedField()
+    category = CachedNameRelatedField(category_cache)
     locations = SerializerMethodField()
 
     class Meta:
@@ -26,10 +29,17 @@ class AdvertisementListViewSerializer(ModelSerializer):
         fields = ["id", "name", "author", "price", "category", "locations"]
 
     def get_locations(self, ad):
-        setattr(ad, "locations", [location.name for location in ad.author.location.all()])
+        setattr(ad, "locations", location_cache.get_names(ad.author.location.values_list("pk", flat=True)))
         return ad.locations
 
 
+class AdCardSerializer(ModelSerializer):
+
+    class Meta:
+        model = AdCard
+        fields = ["id", "name", "author", "price", "category", "locations"]
+
+
 class AdvertisementDetailViewSerializer(ModelSerializer):
     author_id = PrimaryKeyRelatedField(queryset=User.objects.all())
     author = SlugRelatedField(
@@ -37,7 +47,7 @@ class AdvertisementDetailViewSerializer(ModelSerializer):
         slug_field="username",
     )
     category_id = PrimaryKeyRelatedField(queryset=Category.objects.all())
-    category = StringRelatedField()
+    category = CachedNameRelatedField(category_cache)
     locations = SerializerMethodField()
 
     class Meta:
@@ -45,5 +55,12 @@ class AdvertisementDetailViewSerializer(ModelSerializer):
         fields = "__all__"
 
     def get_locations(self, ad):
-        setattr(ad, "locations", [location.name for location in ad.author.location.all()])
+        setattr(ad, "locations", location_cache.get_names(ad.author.location.values_list("pk", flat=True)))
         return ad.locations
+
+
+class ArchivedAdvertisementDetailViewSerializer(AdvertisementDetailViewSerializer):
+
+    class Meta:
+        model = ArchivedAdvertisement
+        fields = "__all__"
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from advertisements.ad_cards import refresh_ad_cards, refresh_ad_cards_for_authors
+from advertisements.cache import category_cache, advertisement_name_index, category_name_index
+from advertisements.change_feed import record_change
+from advertisements.models import Category, Advertisement, AdCard, AdvertisementChangeAction
+from advertisements.price_stats import add_prices, remove_prices
+from users.models import User, Location
+
+advertisement_name_index.connect_signals()
+category_name_index.connect_signals()
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, **kwargs) -> None:
+    transaction.on_commit(category_cache.invalidate)
+
+
+@receiver(post_save, sender=Advertisement)
+def record_advertisement_save(sender, instance: Advertisement, created: bool, **kwargs) -> None:
+    action: str = AdvertisementChangeAction.CREATE if created else AdvertisementChangeAction.UPDATE
+    record_change(action, instance)
+
+
+@receiver(post_delete, sender=Advertisement)
+def record_advertisement_delete(sender, instance: Advertisement, **kwargs) -> None:
+    record_change(AdvertisementChangeAction.DELETE, instance)
+
+
+@receiver(post_save, sender=Advertisement)
+def update_ad_card(sender, instance: Advertisement, **kwargs) -> None:
+    if settings.AD_CARDS_ENABLED:
+        refresh_ad_cards(Advertisement.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Advertisement)
+def delete_ad_card(sender, instance: Advertisement, **kwargs) -> None:
+    if settings.AD_CARDS_ENABLED:
+        AdCard.objects.filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=User)
+def update_ad_cards_author(sender, instance: User, created: bool, **kwargs) -> None:
+    if settings.AD_CARDS_ENABLED and not created:
+        AdCard.objects.filter(author_id=instance.pk).update(author=instance.username)
+
+
+@receiver(m2m_changed, sender=User.location.through)
+def update_ad_cards_locations(sender, instance, action: str, reverse: bool, pk_set, **kwargs) -> None:
+    if not settings.AD_CARDS_ENABLED:
+        return
+
+    if reverse and action == "pre_clear":
+        # post_clear со стороны Location не сообщает, какие пользователи были затронуты
+        setattr(instance, "_cleared_author_ids", list(instance.user_set.values_list("id", flat=True)))
+    elif action not in ("post_add", "post_remove", "post_clear"):
+        return
+    elif not reverse:
+        refresh_ad_cards_for_authors([instance.pk])
+    elif pk_set:
+        refresh_ad_cards_for_authors(pk_set)
+    else:
+        refresh_ad_cards_for_authors(getattr(instance, "_cleared_author_ids", []))
+
+
+@receiver(post_save, sender=Category)
+def update_ad_cards_category(sender, instance: Category, created: bool, **kwargs) -> None:
+    if settings.AD_CARDS_ENABLED and not created:
+        AdCard.objects.filter(category_id=instance.pk).update(category=instance.name)
+
+
+@receiver(post_save, sender=Location)
+def update_ad_cards_location_name(sender, instance: Location, created: bool, **kwargs) -> None:
+    if settings.AD_CARDS_ENABLED and not created:
+        refresh_ad_cards_for_authors(instance.user_set.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Location)
+def remember_location_authors(sender, instance: Location, **kwargs) -> None:
+    # После удаления связи с пользователями уже не найти
+    if settings.AD_CARDS_ENABLED:
+        setattr(instance, "_author_ids", list(instance.user_set.values_list("id", flat=True)))
+
+
+@receiver(post_delete, sender=Location)
+def update_ad_cards_deleted_location(sender, instance: Location, **kwargs) -> None:
+    if settings.AD_CARDS_ENABLED:
+        refresh_ad_cards_for_authors(getattr(instance, "_author_ids", []))
+
+
+@receiver(pre_save, sender=Advertisement)
+def remember_old_values(sender, instance: Advertisement, raw: bool = False, **kwargs) -> None:
+    # loaddata сохраняет объявления в обход Advertisement.save
+    if raw:
+        setattr(instance, "_old_values", Advertisement.get_saved_values(instance.pk))
+
+
+@receiver(pre_delete, sender=Advertisement)
+def remember_deleted_values(sender, instance: Advertisement, **kwargs) -> None:
+    # Удаляемый экземпляр мог устареть, поэтому цена и категория берутся из БД
+    setattr(instance, "_old_values", Advertisement.get_saved_values(instance.pk))
+
+
+@receiver(post_save, sender=Advertisement)
+def update_price_stats(sender, instance: Advertisement, **kwargs) -> None:
+    old_values = getattr(instance, "_old_values", None)
+    if old_values is None:
+        add_prices(instance.category_id, [instance.price])
+        return
+    if (old_values["category_id"], old_values["price"]) == (instance.category_id, instance.price):
+        return
+
+    rebuilt: bool = remove_prices(old_values["category_id"], [old_values["price"]])
+    # Пересчёт с нуля уже учёл новую цену, если категория не изменилась
+    if not rebuilt or old_values["category_id"] != instance.category_id:
+        add_prices(instance.category_id, [instance.price])
+
+
+@receiver(post_delete, sender=Advertisement)
+def remove_price_stats(sender, instance: Advertisement, **kwargs) -> None:
+    old_values = getattr(instance, "_old_values", None)
+    if old_values is not None:
+        remove_prices(old_values["category_id"], [old_values["price"]])
@@ -1,3 +1,437 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from typing import Dict, List, Tuple
+from unittest import mock
 
-# Create your tests here.
+from django.core import serializers
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from advertisements.archive import archive_advertisements, restore_advertisement
+from advertisements.cache import advertisement_name_index
+from advertisements.deletion import delete_author_advertisements
+from advertisements.models import Category, Advertisement, ArchivedAdvertisement, CategoryPriceStats
+from advertisements.pagination import ApproximateCountPaginator
+from advertisements.price_stats import rebuild_category_stats, get_stats_from_aggregates, \
+    get_stats_from_queryset, add_prices, remove_prices
+from homework_29_2.cache import PrefixIndex, publish_prefix_index_deltas, prune_prefix_index_deltas
+from users.models import User
+
+BOUNDS = [0, 100, 500, 1000]
+
+
+@override_settings(PRICE_HISTOGRAM_BOUNDS=BOUNDS, AD_CARDS_ENABLED=False)
+class PriceStatsTestCase(TestCase):
+
+    def setUp(self):
+        self.books = Category.objects.create(name="Книги")
+        self.chairs = Category.objects.create(name="Стулья")
+        self.author = User.objects.create(username="author", password="1", role="Member", age=30)
+        self.other_author = User.objects.create(username="other", password="1", role="Member", age=30)
+
+    def create_ad(self, price: int, category: Category = None, author: User = None) -> Advertisement:
+        return Advertisement.objects.create(
+            name=f"Объявление {price}",
+            author=author or self.author,
+            price=price,
+            description="",
+            is_published=True,
+            category=category or self.books,
+        )
+
+    def snapshot(self, category: Category) -> Tuple:
+        stats = CategoryPriceStats.objects.filter(category=category).first()
+        if stats is None:
+            return 0, 0, None, None, [0] * len(BOUNDS)
+        return stats.count, stats.total, stats.min_price, stats.max_price, stats.histogram
+
+    def assertMatchesRebuild(self):
+        incremental: Dict[int, Tuple] = {
+            category.pk: self.snapshot(category) for category in (self.books, self.chairs)
+        }
+        for category in (self.books, self.chairs):
+            rebuild_category_stats(category.pk)
+        rebuilt: Dict[int, Tuple] = {
+            category.pk: self.snapshot(category) for category in (self.books, self.chairs)
+        }
+        self.assertEqual(incremental, rebuilt)
+
+    def test_create(self):
+        for price in (50, 150, 700, 2000, 150):
+            self.create_ad(price)
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (5, 3050, 50, 2000, [1, 2, 1, 1]))
+
+    def test_update_price(self):
+        cheapest = self.create_ad(50)
+        most_expensive = self.create_ad(2000)
+        self.create_ad(300)
+
+        # Цена минимального объявления растёт, максимального - падает
+        cheapest.price = 900
+        cheapest.save()
+        most_expensive.price = 10
+        most_expensive.save()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books)[2:4], (10, 900))
+
+    def test_update_loaded_from_db(self):
+        self.create_ad(50)
+        advertisement = Advertisement.objects.get(price=50)
+        advertisement.price = 600
+        advertisement.save()
+        # Повторное сохранение без изменений не должно менять статистику
+        advertisement.save()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (1, 600, 600, 600, [0, 0, 1, 0]))
+
+    def test_update_stale_instance(self):
+        self.create_ad(50)
+        first = Advertisement.objects.get(price=50)
+        second = Advertisement.objects.get(price=50)
+
+        first.price = 200
+        first.save()
+        # Второй экземпляр не знает об изменении, но статистика не должна разойтись
+        second.price = 300
+        second.save()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (1, 300, 300, 300, [0, 1, 0, 0]))
+
+    def test_delete_stale_instance(self):
+        stale = self.create_ad(50)
+        self.create_ad(300)
+        Advertisement.objects.filter(pk=stale.pk).update(category=self.chairs)
+        CategoryPriceStats.objects.all().delete()
+        for category in (self.books, self.chairs):
+            rebuild_category_stats(category.pk)
+
+        stale.delete()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.chairs), (0, 0, None, None, [0, 0, 0, 0]))
+
+    def test_loaddata_twice(self):
+        for price in (50, 300):
+            self.create_ad(price)
+        self.create_ad(2000, category=self.chairs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "advertisements.json")
+            with open(path, "w") as fixture:
+                fixture.write(serializers.serialize("json", Advertisement.objects.all()))
+            # Загрузка возвращает объявление в прежнюю категорию
+            moved = Advertisement.objects.get(price=2000)
+            moved.category = self.books
+            moved.save()
+
+            call_command("loaddata", path, verbosity=0)
+            call_command("loaddata", path, verbosity=0)
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books)[0], 2)
+        self.assertEqual(self.snapshot(self.chairs)[0], 1)
+
+    def test_update_with_stale_histogram(self):
+        advertisement = self.create_ad(50)
+        CategoryPriceStats.objects.filter(category=self.books).update(histogram=[1])
+
+        advertisement.price = 600
+        advertisement.save()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (1, 600, 600, 600, [0, 0, 1, 0]))
+
+    def test_move_between_categories(self):
+        moved = self.create_ad(50)
+        self.create_ad(300)
+        self.create_ad(700, category=self.chairs)
+
+        moved.category = self.chairs
+        moved.save()
+        moved = Advertisement.objects.get(pk=moved.pk)
+        moved.category = self.books
+        moved.price = 800
+        moved.save()
+        moved.category = self.chairs
+        moved.save()
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (1, 300, 300, 300, [0, 1, 0, 0]))
+        self.assertEqual(self.snapshot(self.chairs), (2, 1500, 700, 800, [0, 0, 2, 0]))
+
+    def test_delete(self):
+        cheapest = self.create_ad(50)
+        self.create_ad(300)
+        most_expensive = self.create_ad(2000)
+
+        cheapest.delete()
+        most_expensive.delete()
+        self.assertMatchesRebuild()
+
+        Advertisement.objects.all().delete()
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (0, 0, None, None, [0, 0, 0, 0]))
+
+    def test_batched_remove_with_duplicate_prices(self):
+        for price in (50, 50, 300, 2000):
+            self.create_ad(price)
+
+        deleted_ids = list(Advertisement.objects.filter(price=50).values_list("id", flat=True))[:1]
+        Advertisement.objects.filter(id__in=deleted_ids)._raw_delete(Advertisement.objects.db)
+        remove_prices(self.books.pk, [50])
+
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books)[2], 50)
+
+    def test_archive_and_restore(self):
+        for price in (50, 300, 2000):
+            self.create_ad(price, category=self.chairs)
+        self.create_ad(700)
+
+        archived: int = archive_advertisements(Advertisement.objects.filter(category=self.chairs), batch_size=2)
+        self.assertEqual(archived, 3)
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.chairs), (0, 0, None, None, [0, 0, 0, 0]))
+
+        restore_advertisement(ArchivedAdvertisement.objects.get(price=2000))
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.chairs), (1, 2000, 2000, 2000, [0, 0, 0, 1]))
+
+    def test_user_delete(self):
+        for price in (50, 300, 2000):
+            self.create_ad(price)
+            self.create_ad(price + 1, category=self.chairs)
+        self.create_ad(10, author=self.other_author)
+        self.create_ad(3000, category=self.chairs, author=self.other_author)
+
+        deleted: int = delete_author_advertisements(self.author.pk, batch_size=2)
+
+        self.assertEqual(deleted, 6)
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot(self.books), (1, 10, 10, 10, [1, 0, 0, 0]))
+        self.assertEqual(self.snapshot(self.chairs), (1, 3000, 3000, 3000, [0, 0, 0, 1]))
+
+    def test_stale_histogram_is_rebuilt(self):
+        self.create_ad(50)
+        CategoryPriceStats.objects.filter(category=self.books).update(histogram=[1])
+
+        add_prices(self.books.pk, [])
+        self.assertMatchesRebuild()
+        self.assertEqual(len(self.snapshot(self.books)[4]), len(BOUNDS))
+
+    def test_median(self):
+        for price in (100, 200, 300, 400):
+            self.create_ad(price)
+        self.create_ad(5000, category=self.chairs)
+
+        books_stats = get_stats_from_aggregates([str(self.books.pk)])
+        # Все цены в интервале [100, 500): медиана интерполируется между min и max
+        self.assertEqual(books_stats["median"], 250.0)
+        self.assertEqual(books_stats["avg"], 250.0)
+
+        all_stats = get_stats_from_aggregates([])
+        self.assertEqual(all_stats["count"], 5)
+        self.assertEqual(all_stats["median"], 350.0)
+        self.assertEqual(all_stats["max"], 5000)
+
+        query_stats = get_stats_from_queryset(Advertisement.objects.all())
+        self.assertEqual(
+            {key: value for key, value in query_stats.items() if key != "source"},
+            {key: value for key, value in all_stats.items() if key != "source"},
+        )
+
+    def test_median_of_empty_category(self):
+        stats = get_stats_from_aggregates([str(self.books.pk)])
+
+        self.assertEqual(stats["count"], 0)
+        self.assertIsNone(stats["median"])
+        self.assertIsNone(stats["avg"])
+
+
+@override_settings(AD_CARDS_ENABLED=False)
+class PrefixIndexTestCase(TestCase):
+    """
+    Индекс другого процесса должен совпадать с построенным заново
+    после применения записей журнала
+    """
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Мебель")
+        self.author = User.objects.create(username="author", password="1", role="Member", age=30)
+        self.other_author = User.objects.create(username="other", password="1", role="Member", age=30)
+        for name in ("Стол", "стол ", "Стул", "Диван"):
+            self.create_ad(name)
+        self.index = PrefixIndex(advertisement_name_index.name, Advertisement)
+        self.index.warm()
+
+    def tearDown(self):
+        PrefixIndex.instances.remove(self.index)
+
+    def create_ad(self, name: str, author: User = None) -> Advertisement:
+        with self.captureOnCommitCallbacks(execute=True):
+            return Advertisement.objects.create(
+                name=name, author=author or self.author, price=100,
+                description="", is_published=True, category=self.category,
+            )
+
+    @staticmethod
+    def dump(root) -> Dict[str, Tuple]:
+        nodes: Dict[str, Tuple] = {}
+        stack: List[Tuple[str, object]] = [("", root)]
+        while stack:
+            prefix, node = stack.pop()
+            nodes[prefix] = (node.entry, sorted(tuple(entry) for entry in node.top))
+            stack.extend((prefix + char, child) for char, child in node.children.items())
+        return nodes
+
+    def assertMatchesLoad(self):
+        self.assertTrue(self.index.apply_deltas())
+        self.assertEqual(self.dump(self.index._data), self.dump(self.index.load()))
+
+    def test_create_rename_delete(self):
+        self.create_ad("Стол")
+        self.create_ad("Кресло")
+        self.assertMatchesLoad()
+        self.assertEqual(self.index.search("ст", 10), ["Стол", "Стул"])
+
+        renamed = Advertisement.objects.get(name="Стул")
+        renamed.name = "Стол"
+        with self.captureOnCommitCallbacks(execute=True):
+            renamed.save()
+        self.assertMatchesLoad()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Advertisement.objects.filter(name__in=["Диван", "Кресло"]).delete()
+        self.assertMatchesLoad()
+        self.assertEqual(self.index.search("д", 10), [])
+
+    def test_stale_instance(self):
+        first = Advertisement.objects.get(name="Диван")
+        second = Advertisement.objects.get(name="Диван")
+        first.name = "Кресло"
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        second.name = "Пуф"
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+
+        self.assertMatchesLoad()
+        self.assertEqual(self.index.search("к", 10), [])
+
+    def test_delta_committed_during_load_is_not_applied_twice(self):
+        # Запись уже видна загрузке, а номер seq журнал получит только после неё
+        with self.captureOnCommitCallbacks(execute=False):
+            Advertisement.objects.create(
+                name="Стол", author=self.author, price=100,
+                description="", is_published=True, category=self.category,
+            )
+        self.index.warm()
+        publish_prefix_index_deltas()
+
+        self.assertMatchesLoad()
+        self.assertEqual(self.index._data.children["с"].top[0][1], 3)
+
+    def test_user_delete(self):
+        self.create_ad("Стол", author=self.other_author)
+        self.create_ad("Комод", author=self.other_author)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            delete_author_advertisements(self.other_author.pk, batch_size=1)
+        self.assertMatchesLoad()
+        self.assertEqual(self.index.search("к", 10), [])
+
+    def test_pruned_log_requires_rebuild(self):
+        self.create_ad("Кресло")
+        self.create_ad("Комод")
+        prune_prefix_index_deltas(timedelta(0))
+
+        self.assertFalse(self.index.apply_deltas())
+        self.index.warm()
+        self.assertMatchesLoad()
+
+
+@override_settings(PAGINATION_EXACT_COUNT_THRESHOLD=10, AD_CARDS_ENABLED=False)
+class ApproximateCountPaginationTestCase(TestCase):
+    """
+    Размер страницы /ad/ - 5 (PAGE_SIZE), объявлений - 12
+    """
+
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name="Книги")
+        author = User.objects.create(username="author", password="1", role="Member", age=30)
+        Advertisement.objects.bulk_create([
+            Advertisement(name=f"Объявление {index}", author=author, price=index, description="",
+                          is_published=True, category=category)
+            for index in range(12)
+        ])
+
+    def get_page(self, page: int, estimated_count: int = None):
+        if estimated_count is None:
+            return self.client.get("/ad/", {"page": page})
+        # На SQLite оценки планировщика нет, поэтому ошибку оценки подменяем
+        with mock.patch.object(ApproximateCountPaginator, "_get_planner_estimate", return_value=estimated_count):
+            return self.client.get("/ad/", {"page": page})
+
+    def test_exact_count_below_threshold(self):
+        with self.settings(PAGINATION_EXACT_COUNT_THRESHOLD=12):
+            response = self.get_page(1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 12)
+        self.assertTrue(response.data["count_is_exact"])
+        self.assertIsNotNone(response.data["next"])
+
+    def test_estimated_count_above_threshold(self):
+        response = self.get_page(1, estimated_count=500)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 500)
+        self.assertFalse(response.data["count_is_exact"])
+
+    def test_estimate_is_not_below_threshold(self):
+        response = self.get_page(1, estimated_count=3)
+
+        self.assertEqual(response.data["count"], 11)
+        self.assertFalse(response.data["count_is_exact"])
+
+    def test_next_link_when_estimate_is_too_low(self):
+        # По оценке 6 записей - 2 страницы, на самом деле есть и третья
+        with self.settings(PAGINATION_EXACT_COUNT_THRESHOLD=5):
+            response = self.get_page(2, estimated_count=3)
+            self.assertEqual(response.data["count"], 6)
+            self.assertIsNotNone(response.data["next"])
+
+            response = self.get_page(3, estimated_count=3)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
+
+    def test_no_next_link_when_estimate_is_too_high(self):
+        response = self.get_page(3, estimated_count=500)
+
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_next_link_on_full_last_page(self):
+        Advertisement.objects.filter(price__gte=10).delete()
+        with self.settings(PAGINATION_EXACT_COUNT_THRESHOLD=5):
+            response = self.get_page(2, estimated_count=500)
+
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertIsNone(response.data["next"])
+
+    def test_page_beyond_end(self):
+        self.assertEqual(self.get_page(4, estimated_count=500).status_code, 404)
+        self.assertEqual(self.get_page(4).status_code, 404)
+
+    def test_invalid_page_number(self):
+        self.assertEqual(self.get_page(0, estimated_count=500).status_code, 404)
+        self.assertEqual(self.get_page("a", estimated_count=500).status_code, 404)
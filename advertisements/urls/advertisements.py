@@ -5,8 +5,12 @@ from advertisements import views
 urlpatterns = [
     path('', views.AdvertisementListView.as_view()),
     path('<int:pk>/', views.AdvertisementDetailView.as_view()),
+    path('autocomplete/', views.AutocompleteView.as_view()),
+    path('stats/', views.AdvertisementPriceStatsView.as_view()),
+    path('changes/', views.show_advertisement_changes),
     path('create/', views.AdvertisementCreateView.as_view()),
     path('<int:pk>/update/', views.AdvertisementUpdateView.as_view()),
     path('<int:pk>/delete/', views.AdvertisementDeleteView.as_view()),
     path('<int:pk>/upload_image/', views.AdvertisementUploadImage.as_view()),
+    path('<int:pk>/restore/', views.AdvertisementRestoreView.as_view()),
 ]
\ No newline at end of file
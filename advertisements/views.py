@@ -1,17 +1,38 @@
+import asyncio
+import hashlib
 import json
-from typing import Dict
+import math
+import time
+from typing import Dict, List
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
+from django.utils.http import urlencode
 from django.views.generic import CreateView, UpdateView, DeleteView
-from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.generics import ListAPIView, RetrieveAPIView, GenericAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from advertisements.models import Category, Advertisement
+from advertisements.archive import restore_advertisement
+from advertisements.cache import category_cache, advertisement_name_index, category_name_index
+from advertisements.change_feed import get_changes
+from advertisements.etags import get_catalog_etag
+from advertisements.filters import get_list_queryset, filter_advertisements, LIST_FILTER_PARAMS
+from advertisements.models import Category, Advertisement, ArchivedAdvertisement
+from advertisements.pagination import ApproximateCountPagination
+from advertisements.price_stats import get_stats_from_aggregates, get_stats_from_queryset
 from advertisements.serializers import CategoryViewSetSerializer, AdvertisementListViewSerializer, \
-    AdvertisementDetailViewSerializer
+    AdvertisementDetailViewSerializer, AdCardSerializer, ArchivedAdvertisementDetailViewSerializer
+from jobs.queue import enqueue
+from users.cache import location_cache, location_name_index
 from users.models import User
 
 
@@ -19,6 +40,36 @@ def show_main_page(request) -> JsonResponse:
     return JsonResponse({"status": "ok"}, status=200)
 
 
+async def show_advertisement_changes(request) -> JsonResponse:
+    """
+    Отдаёт журнал изменений объявлений начиная с номера since (long polling).
+    Если новых изменений нет, ждёт их до timeout секунд.
+    Под asgi.py ожидание не занимает поток обработчика
+    """
+    try:
+        since: int = int(request.GET.get("since", 0))
+        timeout: float = float(request.GET.get("timeout", settings.AD_CHANGES_MAX_TIMEOUT))
+    except ValueError:
+        return JsonResponse({"error": "since и timeout должны быть числами"}, status=400)
+    if not math.isfinite(timeout):
+        return JsonResponse({"error": "timeout должен быть конечным числом"}, status=400)
+    timeout = max(0.0, min(timeout, settings.AD_CHANGES_MAX_TIMEOUT))
+
+    deadline: float = time.monotonic() + timeout
+    while True:
+        changes: List[Dict] = await sync_to_async(get_changes)(since, settings.AD_CHANGES_PAGE_SIZE)
+        if changes or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(settings.AD_CHANGES_POLL_INTERVAL)
+
+    return JsonResponse(
+        {"changes": changes, "last_seq": changes[-1]["seq"] if changes else since},
+        json_dumps_params={"ensure_ascii": False}
+    )
+
+
+@method_decorator(condition(etag_func=get_catalog_etag), name="list")
+@method_decorator(condition(etag_func=get_catalog_etag), name="retrieve")
 class CategoryViewSet(ModelViewSet):
     """
     Кратко отображает таблицу Категории (сортирует записи по алфавиту),
@@ -32,6 +83,7 @@ class CategoryViewSet(ModelViewSet):
     serializer_class = CategoryViewSetSerializer
 
 
+@method_decorator(condition(etag_func=get_catalog_etag), name="get")
 class AdvertisementListView(ListAPIView):
     """
     Отображает таблицу Advertisement, при запросе фильтрует записи:
@@ -39,33 +91,63 @@ class AdvertisementListView(ListAPIView):
      - по местоположению
      - по тексту в названии объявления
      - по цене
+    При AD_CARDS_ENABLED читает из денормализованной таблицы AdCard без JOIN
     """
     queryset = Advertisement.objects.all().order_by("-price")
     serializer_class = AdvertisementListViewSerializer
+    pagination_class = ApproximateCountPagination
 
     def list(self, request, *args, **kwargs):
+        if settings.AD_CARDS_ENABLED:
+            self.serializer_class = AdCardSerializer
+        self.queryset = filter_advertisements(get_list_queryset(), request.GET)
 
-        categories = request.GET.getlist("cat")
-        if categories:
-            self.queryset = self.queryset.filter(category__in=categories)
+        return super().list(self, request, *args, **kwargs)
 
-        text = request.GET.get("text")
-        if text:
-            self.queryset = self.queryset.filter(name__icontains=text)
 
-        location = request.GET.get("location")
-        if location:
-            self.queryset = self.queryset.filter(author__location__name__icontains=location)
+class AdvertisementPriceStatsView(APIView):
+    """
+    Статистика цен объявлений (min, max, avg, медиана, гистограмма)
+    с теми же фильтрами, что и список объявлений.
+    Фильтр только по категориям отвечает из агрегатов CategoryPriceStats,
+    остальные фильтры считаются запросом и кешируются на PRICE_STATS_CACHE_TTL секунд
+    """
 
-        price_from = request.GET.get("price_from")
-        if price_from:
-            self.queryset = self.queryset.filter(price__gte=price_from)
+    def get(self, request: Request) -> Response:
+        filter_params = sorted(
+            (param, value) for param in LIST_FILTER_PARAMS for value in request.GET.getlist(param) if value
+        )
+        if all(param == "cat" for param, _ in filter_params):
+            return Response(get_stats_from_aggregates(request.GET.getlist("cat")))
 
-        price_to = request.GET.get("price_to")
-        if price_to:
-            self.queryset = self.queryset.filter(price__lte=price_to)
+        cache_key: str = "price_stats:" + hashlib.md5(urlencode(filter_params).encode("utf-8")).hexdigest()
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = get_stats_from_queryset(filter_advertisements(get_list_queryset(), request.GET))
+            cache.set(cache_key, stats, settings.PRICE_STATS_CACHE_TTL)
+        return Response(stats)
 
-        return super().list(self, request, *args, **kwargs)
+
+class AutocompleteView(APIView):
+    """
+    Подсказки для строки поиска: самые частые названия объявлений,
+    категорий и местоположений, начинающиеся с текста из параметра q.
+    Отвечает из индексов в памяти процесса, не обращаясь к БД
+    """
+
+    def get(self, request: Request) -> Response:
+        prefix: str = request.GET.get("q", "")
+        try:
+            limit: int = int(request.GET.get("limit", settings.AUTOCOMPLETE_LIMIT))
+        except ValueError:
+            limit = settings.AUTOCOMPLETE_LIMIT
+        limit = max(1, min(limit, settings.AUTOCOMPLETE_MAX_LIMIT))
+
+        return Response({
+            "ads": advertisement_name_index.search(prefix, limit),
+            "categories": category_name_index.search(prefix, limit),
+            "locations": location_name_index.search(prefix, limit),
+        })
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -80,7 +162,9 @@ class AdvertisementCreateView(CreateView):
         advertisement_data: Dict[str, int | str] = json.loads(request.body)
 
         author = get_object_or_404(User, username=advertisement_data["author"])
-        category = get_object_or_404(Category, id=advertisement_data["category_id"])
+        category_id = advertisement_data["category_id"]
+        if not category_cache.contains(category_id):
+            raise Http404("No Category matches the given query.")
 
         advertisement: Advertisement = Advertisement.objects.create(
             name=advertisement_data.get("name"),
@@ -89,7 +173,7 @@ class AdvertisementCreateView(CreateView):
             description=advertisement_data.get("description"),
             image=advertisement_data.get("image"),
             is_published=advertisement_data.get("is_published"),
-            category=category
+            category_id=category_id
         )
 
         response_as_dict: Dict[str, int | str] = {
@@ -98,23 +182,44 @@ class AdvertisementCreateView(CreateView):
             "author": author.username,
             "price": advertisement.price,
             "description": advertisement.description,
-            "address": [
-                _location.name for _location in advertisement.author.location.all()
-            ],
+            "address": location_cache.get_names(
+                advertisement.author.location.values_list("pk", flat=True)
+            ),
             "image": advertisement.image.url if advertisement.image else None,
             "is_published": advertisement.is_published,
-            "category": category.name
+            "category": category_cache.get_name(category_id)
         }
         return JsonResponse(response_as_dict, json_dumps_params={"ensure_ascii": False, "indent": 4})
 
 
+@method_decorator(condition(etag_func=get_catalog_etag), name="get")
 class AdvertisementDetailView(RetrieveAPIView):
     """
-    Делает выборку записи из таблицы Объявления по id
+    Делает выборку записи из таблицы Объявления по id,
+    если записи там нет - ищет её в архиве
     """
     queryset = Advertisement.objects.all()
     serializer_class = AdvertisementDetailViewSerializer
 
+    def get_object(self) -> Advertisement | ArchivedAdvertisement:
+        try:
+            return super().get_object()
+        except Http404:
+            self.serializer_class = ArchivedAdvertisementDetailViewSerializer
+            return get_object_or_404(ArchivedAdvertisement, pk=self.kwargs["pk"])
+
+
+class AdvertisementRestoreView(GenericAPIView):
+    """
+    Возвращает запись из архива в таблицу Объявления по id
+    """
+    queryset = ArchivedAdvertisement.objects.all()
+    serializer_class = AdvertisementDetailViewSerializer
+
+    def post(self, request, *args, **kwargs) -> Response:
+        advertisement: Advertisement = restore_advertisement(self.get_object())
+        return Response(self.get_serializer(advertisement).data)
+
 
 @method_decorator(csrf_exempt, name="dispatch")
 class AdvertisementUpdateView(UpdateView):
@@ -144,13 +249,13 @@ class AdvertisementUpdateView(UpdateView):
             "author": self.object.author.username,
             "price": self.object.price,
             "description": self.object.description,
-            "address": [
-                _location.name for _location in self.object.author.location.all()
-            ],
+            "address": location_cache.get_names(
+                self.object.author.location.values_list("pk", flat=True)
+            ),
             "image": self.object.image.url if self.object.image else None,
             "is_published": self.object.is_published,
-            "category_id": self.object.category.id,
-            "category_name": self.object.category.name
+            "category_id": self.object.category_id,
+            "category_name": category_cache.get_name(self.object.category_id)
         }
         return JsonResponse(response_as_dict, json_dumps_params={"ensure_ascii": False, "indent": 4})
 
@@ -164,8 +269,15 @@ class AdvertisementDeleteView(DeleteView):
     success_url = "/"
 
     def delete(self, request, *args, **kwargs) -> JsonResponse:
+        image_name: str = self.get_object().image.name
         super().delete(request, *args, **kwargs)
 
+        if image_name:
+            enqueue(
+                "advertisements.delete_image_file", image_name,
+                dedup_key=f"delete_image_file:{image_name}"
+            )
+
         return JsonResponse({"status": "ok"}, status=200)
 
 
@@ -179,9 +291,16 @@ class AdvertisementUploadImage(UpdateView):
 
     def post(self, request, *args, **kwargs):
         self.object: Advertisement = self.get_object()
+        old_image_name: str = self.object.image.name
         self.object.image = request.FILES.get("image")
         self.object.save()
 
+        if old_image_name and old_image_name != self.object.image.name:
+            enqueue(
+                "advertisements.delete_image_file", old_image_name,
+                dedup_key=f"delete_image_file:{old_image_name}"
+            )
+
         response_as_dict: Dict[str, int | str] = {
             "id": self.object.id,
             "name": self.object.name,
@@ -189,12 +308,12 @@ class AdvertisementUploadImage(UpdateView):
             "author": self.object.author.username,
             "price": self.object.price,
             "description": self.object.description,
-            "address": [
-                _location.name for _location in self.object.author.location.all()
-            ],
+            "address": location_cache.get_names(
+                self.object.author.location.values_list("pk", flat=True)
+            ),
             "image": self.object.image.url,
             "is_published": self.object.is_published,
-            "category_id": self.object.category.id,
-            "category_name": self.object.category.name
+            "category_id": self.object.category_id,
+            "category_name": category_cache.get_name(self.object.category_id)
         }
         return JsonResponse(response_as_dict, json_dumps_params={"ensure_ascii": False, "indent": 4})
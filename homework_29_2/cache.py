@@ -0,0 +1,493 @@
+import heapq
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Model, QuerySet, Count, Max, Min
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.utils import timezone
+
+from advertisements.models import PrefixIndexDelta
+from homework_29_2.versions import get_version, bump_version
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки PostgreSQL, которая упорядочивает присвоение номеров seq журналу индексов
+PREFIX_INDEX_LOCK_KEY = 292002
+
+
+class VersionedCache:
+    """
+    Кеш данных в памяти процесса. Копии во всех процессах сбрасываются
+    через версию в таблице DataVersion, которая проверяется не чаще check_interval секунд
+    (по умолчанию VERSIONED_CACHE_CHECK_INTERVAL).
+    При refresh_in_background данные загружаются в отдельном потоке,
+    а до окончания загрузки запросы получают прежнюю копию или None, если копии ещё нет
+    """
+
+    instances: List["VersionedCache"] = []
+
+    def __init__(self, name: str, check_interval: Optional[float] = None,
+                 refresh_in_background: bool = False):
+        self.name: str = name
+        self.check_interval: Optional[float] = check_interval
+        self.refresh_in_background: bool = refresh_in_background
+        self._data: Any = None
+        self._version: Optional[int] = None
+        self._checked_at: float = 0.0
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        VersionedCache.instances.append(self)
+
+    def __deepcopy__(self, memo) -> "VersionedCache":
+        # Поля DRF копируются для каждого сериализатора, а кеш должен оставаться общим
+        return self
+
+    def load(self) -> Any:
+        """
+        Загружает данные из БД
+        :return: Данные для хранения в памяти
+        """
+        raise NotImplementedError
+
+    def warm(self) -> None:
+        """
+        Перезагружает данные из БД
+        """
+        # Версию читаем до загрузки: если данные изменятся во время загрузки,
+        # при следующей проверке кеш перезагрузится ещё раз.
+        # Загрузка идёт без блокировки, под ней данные только подменяются
+        version: int = get_version(self.name)
+        data: Any = self.load()
+        with self._lock:
+            if self._version is None or self._version <= version:
+                self._data = data
+                self._version = version
+            self._checked_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        """
+        Проверяет, изменились ли данные в БД после загрузки
+        :return: True, если данные нужно перезагрузить
+        """
+        return get_version(self.name) != self._version
+
+    def get_data(self) -> Any:
+        """
+        Возвращает актуальные данные, при необходимости перезагружая их
+        :return: Данные из памяти процесса
+        """
+        check_interval: float = self.check_interval
+        if check_interval is None:
+            check_interval = settings.VERSIONED_CACHE_CHECK_INTERVAL
+
+        now: float = time.monotonic()
+        if self._version is None:
+            self._refresh()
+        elif now - self._checked_at >= check_interval:
+            self._checked_at = now
+            if self.is_stale():
+                self._refresh()
+        return self._data
+
+    def _refresh(self) -> None:
+        if not self.refresh_in_background:
+            self.warm()
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            # Данные уже перезагружаются
+            return
+
+        def run() -> None:
+            try:
+                self.warm()
+            except DatabaseError:
+                logger.warning("Не удалось перезагрузить кеш %s", self.name)
+            finally:
+                # Закрывает только соединения этого потока
+                connections.close_all()
+                self._refresh_lock.release()
+        threading.Thread(target=run, name=f"refresh-{self.name}", daemon=True).start()
+
+    def invalidate(self) -> None:
+        """
+        Сбрасывает кеш в текущем и во всех остальных процессах
+        """
+        bump_version(self.name)
+        self._version = None
+
+
+class DimensionCache(VersionedCache):
+    """
+    Кеш соответствия id -> name небольшой, редко изменяемой таблицы
+    """
+
+    def __init__(self, name: str, model: type[Model]):
+        super().__init__(name)
+        self.model = model
+
+    def load(self) -> Dict[int, str]:
+        return dict(self.model.objects.values_list("id", "name"))
+
+    def get_name(self, pk: int | str) -> Optional[str]:
+        """
+        Возвращает название записи по id
+        :param pk: id записи
+        :return: Название записи или None, если запись не найдена
+        """
+        try:
+            pk = int(pk)
+        except (TypeError, ValueError):
+            return None
+
+        name: Optional[str] = self.get_data().get(pk)
+        if name is None:
+            # Запись могла появиться в другом процессе до проверки версии
+            name = self.model.objects.filter(pk=pk).values_list("name", flat=True).first()
+        return name
+
+    def get_names(self, pks: Iterable[int]) -> List[str]:
+        """
+        Возвращает названия записей по списку id
+        :param pks: Список id записей
+        :return: Список названий
+        """
+        names: List[Optional[str]] = [self.get_name(pk) for pk in pks]
+        return [name for name in names if name is not None]
+
+    def contains(self, pk: int | str) -> bool:
+        """
+        Проверяет, существует ли запись с указанным id
+        :param pk: id записи
+        :return: True, если запись существует
+        """
+        return self.get_name(pk) is not None
+
+
+class _PrefixNode:
+    """
+    Узел префиксного дерева. entry - [значение, вес] для ключа, который заканчивается
+    в этом узле, top - самые частые значения среди всех ключей с этим префиксом
+    """
+
+    __slots__ = ("children", "entry", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_PrefixNode"] = {}
+        self.entry: Optional[List] = None
+        self.top: List[List] = []
+
+    def update_top(self, size: int) -> None:
+        candidates: List[Iterable[List]] = [child.top for child in self.children.values()]
+        if self.entry is not None:
+            candidates.append([self.entry])
+        self.top = heapq.nlargest(size, chain.from_iterable(candidates), key=lambda entry: entry[1])
+
+
+class PrefixIndex(VersionedCache):
+    """
+    Индекс для поиска по префиксу: префиксное дерево нормализованных значений поля,
+    в каждом узле которого заранее отобраны AUTOCOMPLETE_MAX_LIMIT самых частых значений
+    (вес - количество записей с таким значением).
+    Изменения весов записываются в журнал PrefixIndexDelta в транзакции изменения записи,
+    и каждый процесс не чаще check_interval секунд применяет к своему индексу новые
+    записи журнала. Целиком индекс перестраивается в фоне после invalidate
+    или если нужные записи журнала уже удалены
+    """
+
+    def __init__(self, name: str, model: type[Model], field: str = "name",
+                 check_interval: Optional[float] = None):
+        super().__init__(name, check_interval, refresh_in_background=True)
+        self.model = model
+        self.field: str = field
+        self._seq: int = 0
+        self._skipped_ids: Set[int] = set()
+
+    @staticmethod
+    def normalize(value: str) -> str:
+        return " ".join(value.split()).casefold()
+
+    def warm(self) -> None:
+        version: int = get_version(self.name)
+        with _snapshot(self.model.objects.db):
+            # Записи журнала, уже зафиксированные, но ещё без seq, учтены в загруженном дереве,
+            # поэтому после публикации их нужно пропустить
+            last_seq: int = _published_deltas().aggregate(last_seq=Max("seq"))["last_seq"] or 0
+            skipped_ids: Set[int] = set(
+                PrefixIndexDelta.objects.filter(index=self.name, seq__isnull=True).values_list("id", flat=True)
+            )
+            root: _PrefixNode = self.load()
+
+        with self._lock:
+            if self._version is None or self._version <= version:
+                self._data = root
+                self._version = version
+                self._seq = last_seq
+                self._skipped_ids = skipped_ids
+            self._checked_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return super().is_stale() or not self.apply_deltas()
+
+    def load(self) -> _PrefixNode:
+        entries: Dict[str, List] = {}
+        rows = (
+            self.model.objects.values(self.field)
+            .annotate(weight=Count("pk"))
+            .values_list(self.field, "weight")
+            .order_by()
+        )
+        for value, weight in rows:
+            key: str = self.normalize(value)
+            if not key:
+                continue
+            if key in entries:
+                entries[key][1] += weight
+            else:
+                entries[key] = [value.strip(), weight]
+
+        root = _PrefixNode()
+        for key, entry in entries.items():
+            node: _PrefixNode = root
+            for char in key:
+                node = node.children.setdefault(char, _PrefixNode())
+            node.entry = entry
+
+        # Списки самых частых значений собираются от листьев к корню
+        size: int = settings.AUTOCOMPLETE_MAX_LIMIT
+        stack: List[Tuple[_PrefixNode, bool]] = [(root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if children_done:
+                node.update_top(size)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+        return root
+
+    def search(self, prefix: str, limit: int) -> List[str]:
+        """
+        Возвращает самые частые значения, начинающиеся с префикса
+        :param prefix: Префикс
+        :param limit: Максимальное количество значений, не больше AUTOCOMPLETE_MAX_LIMIT
+        :return: Список значений
+        """
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+
+        node: Optional[_PrefixNode] = self.get_data()
+        if node is None:
+            # Индекс ещё строится в фоне
+            return []
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [value for value, _ in node.top[:limit]]
+
+    def apply_deltas(self) -> bool:
+        """
+        Применяет к индексу записи журнала, опубликованные после последней проверки
+        :return: False, если часть нужных записей уже удалена и индекс нужно перестроить
+        """
+        # Обычно записи публикует писатель после фиксации, здесь публикуются
+        # только оставшиеся, например, если процесс писателя завершился
+        publish_prefix_index_deltas()
+        with self._lock:
+            seq: int = self._seq
+        bounds: Dict[str, Optional[int]] = _published_deltas().aggregate(first=Min("seq"), last=Max("seq"))
+        if bounds["last"] is None or bounds["last"] <= seq:
+            return True
+        if bounds["first"] > seq + 1:
+            return False
+
+        deltas: List[Tuple[int, str, int]] = list(
+            PrefixIndexDelta.objects.filter(index=self.name, seq__gt=seq, seq__lte=bounds["last"])
+            .order_by("seq")
+            .values_list("id", "value", "delta")
+        )
+        with self._lock:
+            if self._seq != seq:
+                # Индекс успели перестроить или обновить в другом потоке
+                return True
+            for delta_id, value, delta in deltas:
+                if delta_id in self._skipped_ids:
+                    self._skipped_ids.discard(delta_id)
+                else:
+                    self._update(value, delta)
+            self._seq = bounds["last"]
+        return True
+
+    def _update(self, value: str, delta: int) -> None:
+        key: str = self.normalize(value)
+        if not key or self._data is None:
+            return
+
+        path: List[Tuple[str, _PrefixNode]] = [("", self._data)]
+        for char in key:
+            path.append((char, path[-1][1].children.setdefault(char, _PrefixNode())))
+
+        node: _PrefixNode = path[-1][1]
+        weight: int = (node.entry[1] if node.entry else 0) + delta
+        # Запись заменяется новым списком, чтобы параллельный поиск
+        # не увидел наполовину обновлённые данные
+        if weight > 0:
+            node.entry = [node.entry[0] if node.entry else value.strip(), weight]
+        else:
+            node.entry = None
+
+        size: int = settings.AUTOCOMPLETE_MAX_LIMIT
+        for depth in range(len(path) - 1, -1, -1):
+            char, node = path[depth]
+            if depth and node.entry is None and not node.children:
+                del path[depth - 1][1].children[char]
+            else:
+                node.update_top(size)
+
+    def record_deltas(self, deltas: Iterable[Tuple[Optional[str], int]]) -> None:
+        """
+        Записывает изменения весов значений в журнал в текущей транзакции.
+        После фиксации они публикуются и применяются во всех процессах
+        :param deltas: Пары (значение поля, изменение количества записей с этим значением)
+        """
+        rows: List[PrefixIndexDelta] = [
+            PrefixIndexDelta(index=self.name, value=value, delta=delta)
+            for value, delta in deltas
+            if value and self.normalize(value) and delta
+        ]
+        if not rows:
+            return
+        PrefixIndexDelta.objects.bulk_create(rows)
+        transaction.on_commit(self._on_commit)
+
+    def _on_commit(self) -> None:
+        publish_prefix_index_deltas()
+        # Процесс-писатель применит свои изменения при следующем поиске
+        self._checked_at = 0.0
+
+    def connect_signals(self) -> None:
+        """
+        Подключает запись изменений в журнал при сохранении и удалении записей модели
+        """
+        uid: str = f"prefix_index:{self.name}"
+        pre_save.connect(self._remember_old_value, sender=self.model, weak=False, dispatch_uid=uid)
+        post_save.connect(self._on_save, sender=self.model, weak=False, dispatch_uid=uid)
+        pre_delete.connect(self._remember_deleted_value, sender=self.model, weak=False, dispatch_uid=uid)
+        post_delete.connect(self._on_delete, sender=self.model, weak=False, dispatch_uid=uid)
+
+    def _get_saved_value(self, pk: Any) -> Optional[str]:
+        if pk is None:
+            return None
+        return self.model.objects.filter(pk=pk).values_list(self.field, flat=True).first()
+
+    def _remember_old_value(self, sender, instance: Model, raw: bool = False, **kwargs) -> None:
+        # Экземпляр мог устареть, поэтому прежнее значение берётся из БД,
+        # если его уже не прочитал под блокировкой строки метод save модели
+        old_values: Optional[Dict[str, Any]] = getattr(instance, "_old_values", None)
+        if not raw and old_values and self.field in old_values:
+            old_value: Optional[str] = old_values[self.field]
+        else:
+            old_value = self._get_saved_value(instance.pk)
+        setattr(instance, f"_{self.name}_old_value", old_value)
+
+    def _remember_deleted_value(self, sender, instance: Model, **kwargs) -> None:
+        setattr(instance, f"_{self.name}_old_value", self._get_saved_value(instance.pk))
+
+    def _on_save(self, sender, instance: Model, **kwargs) -> None:
+        old_value: Optional[str] = getattr(instance, f"_{self.name}_old_value", None)
+        new_value: str = getattr(instance, self.field)
+        if old_value != new_value:
+            self.record_deltas([(old_value, -1), (new_value, 1)])
+
+    def _on_delete(self, sender, instance: Model, **kwargs) -> None:
+        self.record_deltas([(getattr(instance, f"_{self.name}_old_value", None), -1)])
+
+
+def _published_deltas() -> QuerySet:
+    return PrefixIndexDelta.objects.filter(seq__isnull=False)
+
+
+@contextmanager
+def _snapshot(using: str) -> Iterator[None]:
+    # Все запросы внутри читают один снимок БД. В PostgreSQL для этого
+    # нужна транзакция REPEATABLE READ, SQLite читает снимок в любой транзакции
+    connection = connections[using]
+    outermost: bool = not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def _lock_prefix_index_deltas() -> None:
+    connection = connections[PrefixIndexDelta.objects.db]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [PREFIX_INDEX_LOCK_KEY])
+
+
+def publish_prefix_index_deltas() -> int:
+    """
+    Присваивает номера seq зафиксированным записям журнала индексов, как publish_changes
+    :return: Количество опубликованных записей
+    """
+    # Транзакция и блокировка нужны, только если есть неопубликованные записи
+    if not PrefixIndexDelta.objects.filter(seq__isnull=True).exists():
+        return 0
+
+    with transaction.atomic(using=PrefixIndexDelta.objects.db):
+        _lock_prefix_index_deltas()
+        new_deltas: List[PrefixIndexDelta] = list(
+            PrefixIndexDelta.objects.filter(seq__isnull=True).order_by("id").only("id")
+        )
+        if not new_deltas:
+            return 0
+
+        last_seq: int = _published_deltas().aggregate(last_seq=Max("seq"))["last_seq"] or 0
+        for seq, delta in enumerate(new_deltas, start=last_seq + 1):
+            delta.seq = seq
+        PrefixIndexDelta.objects.bulk_update(new_deltas, ["seq"], batch_size=1000)
+        return len(new_deltas)
+
+
+def prune_prefix_index_deltas(older_than: timedelta) -> int:
+    """
+    Удаляет старые записи журнала индексов. Процесс, который не успел их применить,
+    перестроит свои индексы целиком
+    :param older_than: Возраст удаляемых записей
+    :return: Количество удалённых записей
+    """
+    last_delta: Optional[PrefixIndexDelta] = _published_deltas().order_by("-seq").first()
+    if last_delta is None:
+        return 0
+
+    # Последняя запись остаётся всегда: по ней процессы отличают удалённые записи от ещё не созданных.
+    # Ещё не опубликованные записи без seq тоже не удаляются
+    deleted, _ = PrefixIndexDelta.objects.filter(
+        created_at__lt=timezone.now() - older_than, seq__lt=last_delta.seq
+    ).delete()
+    return deleted
+
+
+def warm_caches() -> None:
+    """
+    Заполняет при запуске процесса кеши, которые загружаются синхронно.
+    Кеши с refresh_in_background, например, индексы автодополнения, строятся
+    в фоне при первом обращении в каждом процессе: поток, запущенный до fork,
+    в дочерние процессы не попадает
+    """
+    for versioned_cache in VersionedCache.instances:
+        if versioned_cache.refresh_in_background:
+            continue
+        try:
+            versioned_cache.warm()
+        except DatabaseError:
+            logger.warning("Не удалось заполнить кеш %s при запуске", versioned_cache.name)
@@ -0,0 +1,41 @@
+from rest_framework.relations import RelatedField, ManyRelatedField, PKOnlyObject, MANY_RELATION_KWARGS
+
+from homework_29_2.cache import DimensionCache
+
+
+class CachedNameManyRelatedField(ManyRelatedField):
+    """
+    Список связанных записей, для которого из БД читаются только id
+    """
+
+    def get_attribute(self, instance):
+        relationship = super().get_attribute(instance)
+        if hasattr(instance, "_prefetched_objects_cache"):
+            if self.source_attrs[-1] in instance._prefetched_objects_cache:
+                return [PKOnlyObject(pk=obj.pk) for obj in relationship]
+        return [PKOnlyObject(pk=pk) for pk in relationship.values_list("pk", flat=True)]
+
+
+class CachedNameRelatedField(RelatedField):
+    """
+    Отображает связанную запись её названием из кеша в памяти процесса
+    """
+
+    def __init__(self, dimension_cache: DimensionCache, **kwargs):
+        self.dimension_cache: DimensionCache = dimension_cache
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs) -> CachedNameManyRelatedField:
+        list_kwargs = {"child_relation": cls(*args, **kwargs), "read_only": True}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return CachedNameManyRelatedField(**list_kwargs)
+
+    def use_pk_only_optimization(self) -> bool:
+        return True
+
+    def to_representation(self, value):
+        return self.dimension_cache.get_name(value.pk)
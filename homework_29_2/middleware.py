@@ -0,0 +1,166 @@
+import random
+import time
+from contextlib import ExitStack
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+from homework_29_2.profiling import QueryProfiler
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _get_accepted_encodings(accept_encoding: str) -> set[str]:
+    encodings: set[str] = set()
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.strip().partition(";")
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Выбирает способ сжатия по заголовку Accept-Encoding
+    :param accept_encoding: Значение заголовка Accept-Encoding
+    :return: "br", "gzip" или None, если клиент не поддерживает сжатие
+    """
+    encodings: set[str] = _get_accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return "br"
+    if "gzip" in encodings:
+        return "gzip"
+    return None
+
+
+def compress(content: bytes, encoding: str) -> bytes:
+    """
+    Сжимает тело ответа
+    :param content: Тело ответа
+    :param encoding: "br" или "gzip"
+    :return: Сжатое тело ответа
+    """
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return compress_string(content)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы brotli (если установлен пакет brotli) или gzip
+    в зависимости от Accept-Encoding. Ответы меньше COMPRESSION_MIN_SIZE байт
+    не сжимаются
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding: Optional[str] = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compressed_content: bytes = compress(response.content, encoding)
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+        response.headers["Content-Encoding"] = encoding
+
+        # Сжатое тело отличается побайтно, поэтому сильный ETag становится слабым
+        etag: Optional[str] = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
+
+
+class SQLProfilerMiddleware:
+    """
+    Профилирует SQL-запросы, выполненные при обработке HTTP-запроса.
+    Включается заголовком X-Profile-SQL со значением SQL_PROFILER_TOKEN
+    или случайно с вероятностью SQL_PROFILER_SAMPLE_RATE.
+    Профиль записывается в журнал homework_29_2.profiling: при заголовке - всегда,
+    при выборке - только если запрос длился дольше SQL_PROFILER_SLOW_REQUEST_MS.
+    Работает и в асинхронном режиме, не переводя асинхронные представления в синхронный
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode: bool = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _is_forced(request) -> bool:
+        token: Optional[str] = settings.SQL_PROFILER_TOKEN
+        return bool(token) and request.headers.get("X-Profile-SQL") == token
+
+    @staticmethod
+    def _start(profiler: QueryProfiler) -> ExitStack:
+        # Обёртки устанавливаются на соединения текущего потока
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profiler))
+        return stack
+
+    @staticmethod
+    def _finish(profiler: QueryProfiler, request, response, duration_ms: float, forced: bool) -> None:
+        if forced or duration_ms >= settings.SQL_PROFILER_SLOW_REQUEST_MS:
+            profiler.explain_slow_queries(settings.SQL_PROFILER_EXPLAIN_THRESHOLD_MS)
+            profiler.log_profile(profiler.get_profile(request, response.status_code, duration_ms))
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        forced: bool = self._is_forced(request)
+        if not forced and random.random() >= settings.SQL_PROFILER_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profiler = QueryProfiler()
+        started: float = time.perf_counter()
+        with self._start(profiler):
+            response = self.get_response(request)
+        self._finish(profiler, request, response, (time.perf_counter() - started) * 1000, forced)
+        return response
+
+    async def __acall__(self, request):
+        forced: bool = self._is_forced(request)
+        if not forced and random.random() >= settings.SQL_PROFILER_SAMPLE_RATE:
+            return await self.get_response(request)
+
+        # Синхронный код запроса (ORM, синхронные представления) выполняется
+        # в одном потоке sync_to_async, поэтому обёртки ставятся в нём же
+        profiler = QueryProfiler()
+        started: float = time.perf_counter()
+        stack: ExitStack = await sync_to_async(self._start)(profiler)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        await sync_to_async(self._finish)(
+            profiler, request, response, (time.perf_counter() - started) * 1000, forced
+        )
+        return response
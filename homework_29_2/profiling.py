@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+def _find_origin() -> Optional[str]:
+    """
+    Ищет в стеке ближайший кадр из кода проекта (views, serializers и т.д.),
+    который выполнил запрос
+    :return: Строка вида "путь:строка в функция" или None
+    """
+    base_dir: str = str(settings.BASE_DIR) + os.sep
+    for frame in reversed(traceback.extract_stack()):
+        filename: str = frame.filename
+        if not filename.startswith(base_dir) or filename == __file__:
+            continue
+        if "site-packages" in filename:
+            continue
+        return f"{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}"
+    return None
+
+
+class QueryProfiler:
+    """
+    Обёртка выполнения запросов (connection.execute_wrapper),
+    которая записывает каждый SQL-запрос, его время и место вызова
+    """
+
+    def __init__(self):
+        self.queries: List[Dict[str, Any]] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started: float = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "sql": sql,
+                "params": params,
+                "many": many,
+                "alias": context["connection"].alias,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "origin": _find_origin(),
+            })
+
+    def explain_slow_queries(self, threshold_ms: float) -> None:
+        """
+        Добавляет план выполнения к SELECT-запросам дольше порога.
+        На PostgreSQL выполняется EXPLAIN ANALYZE, поэтому запросы,
+        изменяющие данные, не анализируются
+        :param threshold_ms: Порог времени запроса в миллисекундах
+        """
+        for query in self.queries:
+            if query["duration_ms"] < threshold_ms or query["many"]:
+                continue
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+
+            connection = connections[query["alias"]]
+            if connection.vendor == "postgresql":
+                prefix: str = connection.ops.explain_query_prefix(format="json", analyze=True, buffers=True)
+            else:
+                prefix = connection.ops.explain_query_prefix()
+
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{prefix} {query['sql']}", query["params"])
+                    query["explain"] = [row[0] if len(row) == 1 else list(row) for row in cursor.fetchall()]
+            except DatabaseError as error:
+                query["explain_error"] = str(error)
+
+    def get_profile(self, request, status_code: int, duration_ms: float) -> Dict[str, Any]:
+        """
+        Собирает профиль запроса для записи в журнал. Параметры SQL не записываются,
+        так как могут содержать пароли и персональные данные
+        :return: Словарь профиля
+        """
+        queries: List[Dict[str, Any]] = [
+            {key: value for key, value in query.items() if key != "params"}
+            for query in self.queries
+        ]
+        return {
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": status_code,
+            "duration_ms": round(duration_ms, 3),
+            "sql_count": len(queries),
+            "sql_duration_ms": round(sum(query["duration_ms"] for query in queries), 3),
+            "queries": queries,
+        }
+
+    @staticmethod
+    def log_profile(profile: Dict[str, Any]) -> None:
+        logger.info(json.dumps(profile, ensure_ascii=False, default=str))
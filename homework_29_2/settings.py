@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os.path
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,10 +42,13 @@ INSTALLED_APPS = [
     'rest_framework',
     'advertisements',
     'users',
+    'jobs',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'homework_29_2.middleware.CompressionMiddleware',
+    'homework_29_2.middleware.SQLProfilerMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -135,3 +140,170 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 5,
 }
+
+# Pagination of large lists
+# Up to this number of rows the total is counted exactly,
+# above it the paginator returns an estimated count
+
+PAGINATION_EXACT_COUNT_THRESHOLD = 1000
+PAGINATION_COUNT_CACHE_TTL = 60
+
+# In-process caches of small tables (Category, Location)
+# Workers drop their copies when the version of the data set in the DataVersion table changes.
+# The version is checked at most once per interval
+
+VERSIONED_CACHE_CHECK_INTERVAL = 1
+
+# Denormalized ad cards for the /ad/ list
+# Enables both signal-based sync of AdCard and reads from it in AdvertisementListView.
+# After switching it on run "python manage.py refresh_ad_cards"
+
+AD_CARDS_ENABLED = False
+
+# Background jobs
+# Jobs are stored in the database and executed by "python manage.py run_worker".
+# A running job that has not reported progress for JOBS_RUNNING_TIMEOUT seconds is requeued
+
+JOBS_MAX_ATTEMPTS = 3
+JOBS_RETRY_DELAY = 10
+JOBS_RUNNING_TIMEOUT = 600
+JOBS_POLL_INTERVAL = 1
+JOBS_STATS_LOG_INTERVAL = 60
+
+# Deleting users with many advertisements
+# Users with more ads than the limit are deleted by a background job
+
+USER_DELETE_SYNC_LIMIT = 1000
+USER_DELETE_BATCH_SIZE = 500
+
+# Autocomplete of ad, category and location names
+# Every prefix keeps its AUTOCOMPLETE_MAX_LIMIT most frequent names.
+# Name changes are logged in PrefixIndexDelta, and every worker applies new entries
+# to its prefix indexes at most once per check interval. Entries older than
+# AUTOCOMPLETE_DELTA_RETENTION seconds are pruned by the background worker
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_CHECK_INTERVAL = 30
+AUTOCOMPLETE_DELTA_RETENTION = 86400
+
+# Change feed of advertisements
+# /ad/changes/?since=<seq> waits up to AD_CHANGES_MAX_TIMEOUT seconds for new changes
+
+AD_CHANGES_PAGE_SIZE = 100
+AD_CHANGES_MAX_TIMEOUT = 25
+AD_CHANGES_POLL_INTERVAL = 1
+AD_CHANGES_RETENTION_DAYS = 30
+
+# Response compression
+# Brotli is used when the optional "brotli" package is installed, otherwise gzip
+
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_BROTLI_QUALITY = 5
+
+# SQL profiler
+# A request is profiled when it sends "X-Profile-SQL: <SQL_PROFILER_TOKEN>"
+# or is picked by SQL_PROFILER_SAMPLE_RATE. Queries slower than
+# SQL_PROFILER_EXPLAIN_THRESHOLD_MS get an EXPLAIN (ANALYZE on PostgreSQL)
+
+SQL_PROFILER_TOKEN = os.environ.get("SQL_PROFILER_TOKEN")
+SQL_PROFILER_SAMPLE_RATE = float(os.environ.get("SQL_PROFILER_SAMPLE_RATE", 0))
+SQL_PROFILER_SLOW_REQUEST_MS = 500
+SQL_PROFILER_EXPLAIN_THRESHOLD_MS = 100
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "homework_29_2.profiling": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
+# Price statistics
+# Histogram buckets are [bound, next bound), the last one is open-ended.
+# After changing the bounds run "python manage.py refresh_price_stats".
+# The background worker also rebuilds the statistics every PRICE_STATS_REFRESH_INTERVAL seconds,
+# which bounds the drift of the incrementally maintained aggregates
+
+PRICE_HISTOGRAM_BOUNDS = [0, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000]
+PRICE_STATS_CACHE_TTL = 60
+PRICE_STATS_REFRESH_INTERVAL = 3600
+
+# Production profile
+# Selected with DJANGO_PROFILE=production: DEBUG is off, the API renders JSON only,
+# admin, sessions, messages and CSRF are dropped and templates are loaded once per process.
+# DJANGO_SECRET_KEY, CACHE_BACKEND and CACHE_LOCATION (a cache shared by all workers) are required
+
+DJANGO_PROFILE = os.environ.get("DJANGO_PROFILE", "development")
+
+if DJANGO_PROFILE == "production":
+    DEBUG = False
+    SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+    ALLOWED_HOSTS = os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost").split(",")
+
+    INSTALLED_APPS = [
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'rest_framework',
+        'advertisements',
+        'users',
+        'jobs',
+    ]
+
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'homework_29_2.middleware.CompressionMiddleware',
+        'homework_29_2.middleware.SQLProfilerMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS'] = {
+        'context_processors': [],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    }
+
+    DATABASES['default'].update({
+        'NAME': os.environ.get('DB_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('DB_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.environ.get('DB_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ.get('DB_PORT', DATABASES['default']['PORT']),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    })
+
+    # Cached counts and price statistics must be shared between workers,
+    # a per-process LocMem cache is not allowed here. The backend has no default:
+    # its client library (redis, pymemcache) is installed together with the cache server
+    if not os.environ.get("CACHE_BACKEND") or not os.environ.get("CACHE_LOCATION"):
+        raise ImproperlyConfigured(
+            "CACHE_BACKEND and CACHE_LOCATION must point to a cache shared by all workers in production"
+        )
+    if os.environ["CACHE_BACKEND"] in ("django.core.cache.backends.locmem.LocMemCache",
+                                       "django.core.cache.backends.dummy.DummyCache"):
+        raise ImproperlyConfigured("CACHE_BACKEND must be shared by all workers in production")
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ['CACHE_BACKEND'],
+            'LOCATION': os.environ['CACHE_LOCATION'],
+        }
+    }
+
+    REST_FRAMEWORK.update({
+        "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+        "DEFAULT_AUTHENTICATION_CLASSES": [],
+        "UNAUTHENTICATED_USER": None,
+    })
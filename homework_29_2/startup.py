@@ -0,0 +1,16 @@
+from django.db import connections
+from django.urls import get_resolver
+
+from homework_29_2.cache import warm_caches
+
+
+def warm_up() -> None:
+    """
+    Подготавливает процесс к первому запросу: импортирует все URL-модули
+    и строит таблицы маршрутов, заполняет небольшие кеши в памяти.
+    Соединения с БД закрываются, чтобы их не унаследовали процессы,
+    созданные fork после предварительной загрузки приложения
+    """
+    get_resolver().reverse_dict
+    warm_caches()
+    connections.close_all()
@@ -13,7 +13,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
 from django.conf.urls.static import static
 from rest_framework.routers import SimpleRouter
@@ -30,13 +30,20 @@ category_router = SimpleRouter()
 category_router.register("cat", CategoryViewSet)
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('', views.show_main_page),
     path('ad/', include("advertisements.urls.advertisements")),
     path('user/', include("users.urls.users")),
-    path('api-auth/', include("rest_framework.urls"))
+    path('jobs/', include("jobs.urls.jobs")),
 ]
 
+# В production-профиле админка и страницы входа DRF отключены
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
+if apps.is_installed("django.contrib.sessions"):
+    urlpatterns.append(path('api-auth/', include("rest_framework.urls")))
+
 urlpatterns += location_router.urls
 urlpatterns += category_router.urls
 
@@ -0,0 +1,41 @@
+from typing import Dict, Iterable
+
+from django.db import transaction
+from django.db.models import F
+
+from advertisements.models import DataVersion
+
+
+def get_version(name: str) -> int:
+    """
+    Возвращает текущую версию набора данных из БД
+    :param name: Название набора данных
+    :return: Номер версии
+    """
+    return DataVersion.objects.filter(name=name).values_list("value", flat=True).first() or 0
+
+
+def get_versions(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Возвращает текущие версии нескольких наборов данных одним запросом
+    :param names: Названия наборов данных
+    :return: Словарь название -> номер версии
+    """
+    names = list(names)
+    versions: Dict[str, int] = dict(DataVersion.objects.filter(name__in=names).values_list("name", "value"))
+    return {name: versions.get(name, 0) for name in names}
+
+
+def bump_version(name: str) -> int:
+    """
+    Увеличивает версию набора данных, чтобы все процессы сбросили свои копии.
+    Версия хранится в БД, поэтому она общая для всех процессов и никогда не сбрасывается
+    :param name: Название набора данных
+    :return: Новый номер версии
+    """
+    with transaction.atomic():
+        if not DataVersion.objects.filter(name=name).update(value=F("value") + 1):
+            DataVersion.objects.get_or_create(name=name)
+            DataVersion.objects.filter(name=name).update(value=F("value") + 1)
+        # Строка заблокирована до конца транзакции, поэтому читаем своё значение
+        return DataVersion.objects.filter(name=name).values_list("value", flat=True).get()
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import run_next_job, requeue_stale_jobs, get_queue_stats, enqueue_periodic_jobs
+
+
+class Command(BaseCommand):
+    help = "Запускает обработчик фоновых задач"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--burst", action="store_true",
+            help="Выполнить готовые задачи и завершиться"
+        )
+
+    def handle(self, *args, **options):
+        stats_logged_at: float = 0.0
+        try:
+            while True:
+                if time.monotonic() - stats_logged_at >= settings.JOBS_STATS_LOG_INTERVAL:
+                    requeue_stale_jobs()
+                    enqueue_periodic_jobs()
+                    self.stdout.write(f"Очередь задач: {get_queue_stats()}")
+                    stats_logged_at = time.monotonic()
+
+                if run_next_job() is not None:
+                    continue
+                if options["burst"]:
+                    break
+                time.sleep(settings.JOBS_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write("Обработчик задач остановлен")
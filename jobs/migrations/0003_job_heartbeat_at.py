@@ -0,0 +1,25 @@
+# Generated by Django 4.1.4 on 2026-10-19 17:31
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_heartbeat_at(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+    Job.objects.filter(status="running").update(heartbeat_at=F("started_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_job_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(fill_heartbeat_at, migrations.RunPython.noop),
+    ]
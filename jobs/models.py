@@ -0,0 +1,46 @@
+from django.db.models import Model, CharField, TextChoices, JSONField, \
+    PositiveSmallIntegerField, DateTimeField, TextField, UniqueConstraint, Index, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class JobStatus(TextChoices):
+    PENDING = "pending", _("pending")
+    RUNNING = "running", _("running")
+    DONE = "done", _("done")
+    FAILED = "failed", _("failed")
+
+
+class Job(Model):
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        constraints = [
+            UniqueConstraint(
+                fields=["dedup_key"],
+                condition=Q(status="pending"),
+                name="unique_pending_job_dedup_key",
+            ),
+        ]
+        indexes = [
+            Index(fields=["status", "run_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+    name = CharField(max_length=200)
+    args = JSONField(default=list)
+    kwargs = JSONField(default=dict)
+    dedup_key = CharField(max_length=200, null=True, blank=True)
+    status = CharField(max_length=7, choices=JobStatus.choices, default=JobStatus.PENDING)
+    attempts = PositiveSmallIntegerField(default=0)
+    max_attempts = PositiveSmallIntegerField(default=3)
+    last_error = TextField(blank=True, default="")
+    progress = JSONField(default=dict)
+    run_at = DateTimeField(default=timezone.now)
+    created_at = DateTimeField(auto_now_add=True)
+    started_at = DateTimeField(null=True)
+    heartbeat_at = DateTimeField(null=True)
+    finished_at = DateTimeField(null=True)
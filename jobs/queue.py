@@ -0,0 +1,200 @@
+import logging
+import traceback
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Min
+from django.utils import timezone
+
+from jobs.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, Callable] = {}
+_intervals: Dict[str, int] = {}
+_current_job: ContextVar[Optional[Job]] = ContextVar("current_job", default=None)
+
+
+def job(name: str, interval: Optional[int] = None) -> Callable:
+    """
+    Регистрирует функцию как фоновую задачу
+    :param name: Название задачи, по которому она ставится в очередь
+    :param interval: Период в секундах, с которым задача ставится в очередь обработчиком задач
+    :return: Декоратор
+    """
+    def decorator(func: Callable) -> Callable:
+        _registry[name] = func
+        if interval:
+            _intervals[name] = interval
+        return func
+    return decorator
+
+
+def enqueue(name: str, *args, dedup_key: Optional[str] = None,
+            delay: int = 0, max_attempts: Optional[int] = None, **kwargs) -> Job:
+    """
+    Ставит задачу в очередь. Задача появится в очереди только после фиксации
+    текущей транзакции, поэтому при её откате задача тоже отменится
+    :param name: Название задачи
+    :param dedup_key: Ключ, по которому не допускаются две ожидающие задачи
+    :param delay: Задержка перед выполнением в секундах
+    :param max_attempts: Количество попыток выполнения
+    :return: Новая или уже ожидающая задача с тем же ключом
+    """
+    if name not in _registry:
+        raise KeyError(f"Задача {name} не зарегистрирована")
+
+    if dedup_key:
+        existing_job: Optional[Job] = Job.objects.filter(dedup_key=dedup_key, status=JobStatus.PENDING).first()
+        if existing_job:
+            return existing_job
+
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                args=list(args),
+                kwargs=kwargs,
+                dedup_key=dedup_key,
+                max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+                run_at=timezone.now() + timedelta(seconds=delay),
+            )
+    except IntegrityError:
+        # Такую же задачу параллельно поставил другой процесс
+        return Job.objects.get(dedup_key=dedup_key, status=JobStatus.PENDING)
+
+
+def enqueue_periodic_jobs() -> None:
+    """
+    Ставит в очередь периодические задачи, у которых нет ожидающего запуска.
+    Следующий запуск назначается через период после вызова, поэтому между
+    запусками проходит не больше периода и интервала вызова этой функции
+    """
+    for name, interval in _intervals.items():
+        enqueue(name, dedup_key=f"periodic:{name}", delay=interval)
+
+
+def _claim_next_job() -> Optional[Job]:
+    with transaction.atomic():
+        next_job: Optional[Job] = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=JobStatus.PENDING, run_at__lte=timezone.now())
+            .order_by("run_at", "id")
+            .first()
+        )
+        if next_job is None:
+            return None
+
+        next_job.status = JobStatus.RUNNING
+        next_job.attempts += 1
+        next_job.started_at = next_job.heartbeat_at = timezone.now()
+        next_job.save(update_fields=["status", "attempts", "started_at", "heartbeat_at"])
+        return next_job
+
+
+def run_next_job() -> Optional[Job]:
+    """
+    Выполняет одну готовую задачу из очереди
+    :return: Выполненная задача или None, если очередь пуста
+    """
+    current_job: Optional[Job] = _claim_next_job()
+    if current_job is None:
+        return None
+
+    token = _current_job.set(current_job)
+    try:
+        _registry[current_job.name](*current_job.args, **current_job.kwargs)
+    except Exception:
+        current_job.last_error = traceback.format_exc()
+        if current_job.attempts >= current_job.max_attempts:
+            current_job.status = JobStatus.FAILED
+            current_job.finished_at = timezone.now()
+            logger.exception("Задача %s завершилась ошибкой", current_job)
+        else:
+            current_job.status = JobStatus.PENDING
+            current_job.run_at = timezone.now() + timedelta(
+                seconds=settings.JOBS_RETRY_DELAY * 2 ** (current_job.attempts - 1)
+            )
+            logger.warning("Задача %s будет повторена в %s", current_job, current_job.run_at)
+    else:
+        current_job.status = JobStatus.DONE
+        current_job.finished_at = timezone.now()
+    finally:
+        _current_job.reset(token)
+
+    try:
+        with transaction.atomic():
+            current_job.save(update_fields=["status", "run_at", "finished_at", "last_error"])
+    except IntegrityError:
+        # Повтор не нужен: пока задача выполнялась, в очередь поставили такую же
+        current_job.delete()
+    return current_job
+
+
+def report_progress(**progress) -> None:
+    """
+    Сохраняет прогресс выполняемой задачи и отмечает, что задача ещё выполняется,
+    чтобы requeue_stale_jobs не вернул её в очередь. Вне обработчика задач ничего не делает
+    :param progress: Произвольные данные о прогрессе
+    """
+    current_job: Optional[Job] = _current_job.get()
+    if current_job is None:
+        return
+    current_job.progress = progress
+    current_job.heartbeat_at = timezone.now()
+    Job.objects.filter(pk=current_job.pk).update(progress=progress, heartbeat_at=current_job.heartbeat_at)
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Возвращает в очередь задачи, зависшие в статусе running после падения обработчика:
+    задача считается зависшей, если дольше JOBS_RUNNING_TIMEOUT секунд не сообщала о прогрессе.
+    Задачи, исчерпавшие попытки, помечаются как failed
+    :return: Количество возвращённых в очередь задач
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.JOBS_RUNNING_TIMEOUT)
+    stale_jobs = Job.objects.filter(status=JobStatus.RUNNING, heartbeat_at__lt=stale_before)
+    requeued: int = 0
+    for stale_job in stale_jobs:
+        # Обработчик мог успеть сообщить о прогрессе или завершить задачу после выборки
+        still_stale = Job.objects.filter(
+            pk=stale_job.pk, status=JobStatus.RUNNING, heartbeat_at__lt=stale_before
+        )
+        if stale_job.attempts >= stale_job.max_attempts:
+            if still_stale.update(
+                status=JobStatus.FAILED,
+                finished_at=now,
+                last_error=f"Обработчик не отвечал дольше {settings.JOBS_RUNNING_TIMEOUT} секунд",
+            ):
+                logger.error("Задача %s исчерпала попытки и помечена как failed", stale_job)
+            continue
+
+        try:
+            with transaction.atomic():
+                requeued += still_stale.update(status=JobStatus.PENDING, run_at=now)
+        except IntegrityError:
+            # Такая же задача уже ожидает выполнения
+            still_stale.delete()
+    return requeued
+
+
+def get_queue_stats() -> Dict[str, int | float]:
+    """
+    Возвращает метрики очереди: глубину и задержку выполнения
+    :return: Словарь с метриками
+    """
+    now = timezone.now()
+    ready_jobs = Job.objects.filter(status=JobStatus.PENDING, run_at__lte=now)
+    oldest_run_at = ready_jobs.aggregate(oldest=Min("run_at"))["oldest"]
+
+    return {
+        "pending": Job.objects.filter(status=JobStatus.PENDING).count(),
+        "ready": ready_jobs.count(),
+        "running": Job.objects.filter(status=JobStatus.RUNNING).count(),
+        "failed": Job.objects.filter(status=JobStatus.FAILED).count(),
+        "lag_seconds": (now - oldest_run_at).total_seconds() if oldest_run_at else 0.0,
+    }
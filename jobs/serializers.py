@@ -0,0 +1,19 @@
+from rest_framework.serializers import ModelSerializer, SerializerMethodField
+
+from jobs.models import Job
+
+
+class JobDetailViewSerializer(ModelSerializer):
+    # Полный traceback остаётся в БД, наружу отдаётся только сообщение об ошибке
+    last_error = SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            "id", "name", "status", "attempts", "progress", "last_error",
+            "run_at", "created_at", "started_at", "heartbeat_at", "finished_at",
+        ]
+
+    def get_last_error(self, job):
+        lines = job.last_error.strip().splitlines()
+        return lines[-1] if lines else ""
@@ -0,0 +1,196 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from jobs.models import Job, JobStatus
+from jobs.queue import job, enqueue, run_next_job, report_progress, requeue_stale_jobs, enqueue_periodic_jobs
+
+calls = []
+
+
+@job("tests.record")
+def record(value) -> None:
+    calls.append(value)
+
+
+@job("tests.fail")
+def fail() -> None:
+    raise RuntimeError("ошибка задачи")
+
+
+@job("tests.enqueue_duplicate_and_fail")
+def enqueue_duplicate_and_fail() -> None:
+    enqueue("tests.enqueue_duplicate_and_fail", dedup_key="key")
+    raise RuntimeError("ошибка задачи")
+
+
+@job("tests.periodic", interval=60)
+def periodic() -> None:
+    calls.append("periodic")
+
+
+@job("tests.report")
+def report() -> None:
+    report_progress(done=1)
+
+
+@override_settings(JOBS_MAX_ATTEMPTS=3, JOBS_RETRY_DELAY=10, JOBS_RUNNING_TIMEOUT=600)
+class QueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_unknown_job(self):
+        with self.assertRaises(KeyError):
+            enqueue("tests.unknown")
+
+    def test_claim_order(self):
+        later = enqueue("tests.record", "later", delay=60)
+        first = enqueue("tests.record", "first")
+        second = enqueue("tests.record", "second")
+
+        self.assertEqual(run_next_job().pk, first.pk)
+        self.assertEqual(run_next_job().pk, second.pk)
+        self.assertIsNone(run_next_job())
+        self.assertEqual(calls, ["first", "second"])
+
+        later.refresh_from_db()
+        self.assertEqual(later.status, JobStatus.PENDING)
+        self.assertEqual(later.attempts, 0)
+
+    def test_done(self):
+        enqueue("tests.record", "value")
+        done_job = run_next_job()
+
+        done_job.refresh_from_db()
+        self.assertEqual(done_job.status, JobStatus.DONE)
+        self.assertEqual(done_job.attempts, 1)
+        self.assertIsNotNone(done_job.finished_at)
+
+    def test_retry_with_backoff(self):
+        failed_job = enqueue("tests.fail")
+
+        started = timezone.now()
+        run_next_job()
+        failed_job.refresh_from_db()
+        self.assertEqual(failed_job.status, JobStatus.PENDING)
+        self.assertEqual(failed_job.attempts, 1)
+        self.assertIn("ошибка задачи", failed_job.last_error)
+        self.assertGreaterEqual(failed_job.run_at, started + timedelta(seconds=10))
+        # До истечения задержки задача не выполняется повторно
+        self.assertIsNone(run_next_job())
+
+        Job.objects.filter(pk=failed_job.pk).update(run_at=timezone.now())
+        run_next_job()
+        failed_job.refresh_from_db()
+        self.assertEqual(failed_job.attempts, 2)
+        self.assertGreaterEqual(failed_job.run_at, started + timedelta(seconds=20))
+
+    def test_fail_after_max_attempts(self):
+        failed_job = enqueue("tests.fail", max_attempts=2)
+        for _ in range(2):
+            Job.objects.filter(pk=failed_job.pk).update(run_at=timezone.now())
+            run_next_job()
+
+        failed_job.refresh_from_db()
+        self.assertEqual(failed_job.status, JobStatus.FAILED)
+        self.assertEqual(failed_job.attempts, 2)
+        self.assertIsNotNone(failed_job.finished_at)
+        self.assertIsNone(run_next_job())
+
+    def test_dedup(self):
+        first = enqueue("tests.record", "a", dedup_key="key")
+        second = enqueue("tests.record", "b", dedup_key="key")
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+        run_next_job()
+        third = enqueue("tests.record", "c", dedup_key="key")
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_retry_superseded_by_pending_duplicate(self):
+        failed_job = enqueue("tests.enqueue_duplicate_and_fail", dedup_key="key")
+        run_next_job()
+
+        # Повтор не сохраняется: такая же задача уже ожидает выполнения
+        self.assertFalse(Job.objects.filter(pk=failed_job.pk).exists())
+        self.assertEqual(Job.objects.filter(dedup_key="key", status=JobStatus.PENDING).count(), 1)
+
+    def test_report_progress(self):
+        enqueue("tests.report")
+        reported_job = run_next_job()
+
+        reported_job.refresh_from_db()
+        self.assertEqual(reported_job.progress, {"done": 1})
+        self.assertGreaterEqual(reported_job.heartbeat_at, reported_job.started_at)
+        # Вне обработчика задач прогресс не сохраняется
+        report_progress(done=2)
+
+    def _make_running(self, attempts: int, max_attempts: int = 3, heartbeat_age: int = 601, **kwargs) -> Job:
+        running_job = enqueue("tests.record", "value", max_attempts=max_attempts, **kwargs)
+        heartbeat_at = timezone.now() - timedelta(seconds=heartbeat_age)
+        Job.objects.filter(pk=running_job.pk).update(
+            status=JobStatus.RUNNING, attempts=attempts,
+            started_at=heartbeat_at - timedelta(hours=1), heartbeat_at=heartbeat_at
+        )
+        return running_job
+
+    def test_requeue_stale_job(self):
+        stale_job = self._make_running(attempts=1)
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        stale_job.refresh_from_db()
+        self.assertEqual(stale_job.status, JobStatus.PENDING)
+        self.assertEqual(run_next_job().pk, stale_job.pk)
+
+    def test_requeue_skips_live_job(self):
+        # Задача запущена давно, но недавно сообщала о прогрессе
+        live_job = self._make_running(attempts=1, heartbeat_age=10)
+
+        self.assertEqual(requeue_stale_jobs(), 0)
+        live_job.refresh_from_db()
+        self.assertEqual(live_job.status, JobStatus.RUNNING)
+
+    def test_requeue_fails_exhausted_job(self):
+        exhausted_job = self._make_running(attempts=3)
+
+        self.assertEqual(requeue_stale_jobs(), 0)
+        exhausted_job.refresh_from_db()
+        self.assertEqual(exhausted_job.status, JobStatus.FAILED)
+        self.assertIsNotNone(exhausted_job.finished_at)
+        self.assertIsNone(run_next_job())
+
+    def test_requeue_with_pending_duplicate(self):
+        stale_job = self._make_running(attempts=1, dedup_key="key")
+        duplicate = enqueue("tests.record", "value", dedup_key="key")
+
+        requeue_stale_jobs()
+        self.assertFalse(Job.objects.filter(pk=stale_job.pk).exists())
+        self.assertTrue(Job.objects.filter(pk=duplicate.pk, status=JobStatus.PENDING).exists())
+
+    def test_detail_hides_traceback(self):
+        failed_job = enqueue("tests.fail", max_attempts=1)
+        run_next_job()
+
+        response = self.client.get(f"/jobs/{failed_job.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["last_error"], "RuntimeError: ошибка задачи")
+
+    def test_enqueue_periodic_jobs(self):
+        started = timezone.now()
+        enqueue_periodic_jobs()
+        enqueue_periodic_jobs()
+
+        periodic_jobs = Job.objects.filter(name="tests.periodic")
+        self.assertEqual(periodic_jobs.count(), 1)
+        self.assertGreaterEqual(periodic_jobs.get().run_at, started + timedelta(seconds=60))
+        # Задачи без периода сами в очередь не ставятся
+        self.assertFalse(Job.objects.filter(name__startswith="tests.").exclude(name="tests.periodic").exists())
+
+        periodic_jobs.update(run_at=timezone.now())
+        run_next_job()
+        enqueue_periodic_jobs()
+        self.assertEqual(calls, ["periodic"])
+        self.assertEqual(periodic_jobs.filter(status=JobStatus.PENDING).count(), 1)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from jobs import views
+
+urlpatterns = [
+    path('stats/', views.JobQueueStatsView.as_view()),
+    path('<int:pk>/', views.JobDetailView.as_view()),
+]
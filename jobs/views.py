@@ -0,0 +1,25 @@
+from rest_framework.generics import RetrieveAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from jobs.models import Job
+from jobs.queue import get_queue_stats
+from jobs.serializers import JobDetailViewSerializer
+
+
+class JobQueueStatsView(APIView):
+    """
+    Отображает метрики очереди фоновых задач: глубину и задержку
+    """
+
+    def get(self, request: Request) -> Response:
+        return Response(get_queue_stats())
+
+
+class JobDetailView(RetrieveAPIView):
+    """
+    Отображает статус и прогресс фоновой задачи по id
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobDetailViewSerializer
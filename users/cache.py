@@ -0,0 +1,10 @@
+from django.conf import settings
+
+from homework_29_2.cache import DimensionCache, PrefixIndex
+from users.models import Location
+
+location_cache = DimensionCache("location", Location)
+
+location_name_index = PrefixIndex(
+    "location_name_index", Location, check_interval=settings.AUTOCOMPLETE_CHECK_INTERVAL
+)
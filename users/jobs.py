@@ -0,0 +1,21 @@
+from django.conf import settings
+
+from advertisements.deletion import delete_author_advertisements
+from jobs.queue import job, report_progress
+from users.models import User
+
+
+@job("users.delete_user")
+def delete_user(user_id: int) -> None:
+    """
+    Удаляет пользователя вместе с его объявлениями и связями с местоположениями.
+    Объявления удаляются пачками, прогресс сохраняется в задаче
+    :param user_id: id пользователя
+    """
+    delete_author_advertisements(
+        user_id,
+        batch_size=settings.USER_DELETE_BATCH_SIZE,
+        on_batch=lambda deleted: report_progress(deleted_advertisements=deleted),
+    )
+    User.location.through.objects.filter(user_id=user_id).delete()
+    User.objects.filter(pk=user_id).delete()
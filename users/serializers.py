@@ -1,12 +1,14 @@
-from rest_framework.relations import SlugRelatedField, StringRelatedField
+from rest_framework.relations import SlugRelatedField
 from rest_framework.serializers import ModelSerializer, SerializerMethodField
 
+from homework_29_2.fields import CachedNameRelatedField
+from users.cache import location_cache
 from users.models import User, Location
 
 
 class UserListViewSerializer(ModelSerializer):
     total_advertisements = SerializerMethodField()
-    location = StringRelatedField(many=True)
+    location = CachedNameRelatedField(location_cache, many=True)
 
     class Meta:
         model = User
@@ -17,7 +19,7 @@ class UserListViewSerializer(ModelSerializer):
 
 
 class UserDetailViewSerializer(ModelSerializer):
-    location = StringRelatedField(many=True)
+    location = CachedNameRelatedField(location_cache, many=True)
 
     class Meta:
         model = User
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from homework_29_2.versions import bump_version
+from users.cache import location_cache, location_name_index
+from users.models import Location, User
+
+location_name_index.connect_signals()
+
+
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location_cache(sender, **kwargs) -> None:
+    transaction.on_commit(location_cache.invalidate)
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver(m2m_changed, sender=User.location.through)
+def bump_user_version(sender, **kwargs) -> None:
+    # Версия пользователей входит в ETag списков
+    transaction.on_commit(lambda: bump_version("user"))
@@ -1,11 +1,21 @@
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework import status
 from rest_framework.generics import RetrieveAPIView, ListAPIView, DestroyAPIView, CreateAPIView, UpdateAPIView
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from advertisements.etags import get_catalog_etag
+from jobs.models import Job
+from jobs.queue import enqueue
+from users.jobs import delete_user
 from users.models import User, Location
 from users.serializers import LocationViewSetSerializer, UserDetailViewSerializer, \
     UserListViewSerializer, UserCreateViewSerializer, UserUpdateViewSerializer
 
 
+@method_decorator(condition(etag_func=get_catalog_etag), name="get")
 class UserListView(ListAPIView):
     """
     Кратко отображает таблицу Пользователи
@@ -14,6 +24,7 @@ class UserListView(ListAPIView):
     serializer_class = UserListViewSerializer
 
 
+@method_decorator(condition(etag_func=get_catalog_etag), name="get")
 class UserDetailView(RetrieveAPIView):
     """
     Делает выборку записи из таблицы Пользователи по id
@@ -40,12 +51,30 @@ class UserUpdateView(UpdateAPIView):
 
 class UserDeleteView(DestroyAPIView):
     """
-    Удаляет запись User по id
+    Удаляет запись User по id.
+    Если у пользователя больше USER_DELETE_SYNC_LIMIT объявлений,
+    удаление выполняется фоновой задачей, прогресс доступен по /jobs/<id>/
     """
     queryset = User.objects.all()
     serializer_class = UserDetailViewSerializer
 
+    def destroy(self, request, *args, **kwargs) -> Response:
+        user: User = self.get_object()
 
+        sync_limit: int = settings.USER_DELETE_SYNC_LIMIT
+        if user.advertisement_set.all()[:sync_limit + 1].count() <= sync_limit:
+            delete_user(user.pk)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        delete_job: Job = enqueue("users.delete_user", user.pk, dedup_key=f"delete_user:{user.pk}")
+        return Response(
+            {"status": "accepted", "job_id": delete_job.pk},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+@method_decorator(condition(etag_func=get_catalog_etag), name="list")
+@method_decorator(condition(etag_func=get_catalog_etag), name="retrieve")
 class LocationViewSet(ModelViewSet):
     """
     Кратко отображает таблицу Местоположения,